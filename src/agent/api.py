@@ -3,14 +3,25 @@ import json
 import time
 import asyncio
 import logging
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional, Union
-from fastapi import FastAPI, HTTPException, Request, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from dataclasses import asdict
 
-from agent import run_agent, get_incidents, get_restart_counts
-from incident_store import incident_store, Incident
+from agent import run_agent, run_agent_from_analysis, get_incidents, get_restart_counts
+from incident_store import incident_store, issue_index, Incident, encode_cursor, decode_cursor
+from mcp_client import async_mcp_manager
+from outbox import outbox
+from llm_cache import llm_cache
+from sub_agents.logger import get_payload_stats
+from sub_agents.detector import detector
+from sub_agents.seer import analysis_from_alerts
+from sub_agents.vision import annotation_coalescer
+from sub_agents.medic import ensure_issue_index
 
 # Get the agent loggers
 logger = logging.getLogger("agent")
@@ -24,23 +35,73 @@ oracle_logger = logging.getLogger("agent.oracle")
 
 # Create a custom handler to store logs in memory
 class MemoryLogHandler(logging.Handler):
+    """Fixed-capacity ring buffer of log entries with monotonically increasing sequence ids"""
+    
     def __init__(self, max_logs=100):
         super().__init__()
-        self.logs = []
         self.max_logs = max_logs
+        self._buffer: List[Optional[Dict[str, Any]]] = [None] * max_logs
+        self._next_seq = 1
+        self._listeners = set()
+    
+    @property
+    def last_seq(self) -> int:
+        """Sequence id of the newest entry (0 if nothing has been logged yet)"""
+        return self._next_seq - 1
+    
+    @property
+    def logs(self) -> List[Dict[str, Any]]:
+        """All buffered entries, oldest first"""
+        return self.read()
     
     def emit(self, record):
-        log_entry = {
+        # Handler.handle() already holds self.lock here
+        seq = self._next_seq
+        self._buffer[seq % self.max_logs] = {
+            "seq": seq,
             "timestamp": record.created,
             "component": record.name,
             "level": record.levelname,
             "message": record.getMessage()
         }
-        self.logs.append(log_entry)
+        self._next_seq = seq + 1
+        self._notify()
+    
+    def read(self, after: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get the entries with a sequence id greater than `after`, oldest first"""
+        self.acquire()
+        try:
+            start = max(after + 1, self._next_seq - self.max_logs, 1)
+            if limit and limit > 0:
+                start = max(start, self._next_seq - limit)
+            return [self._buffer[seq % self.max_logs] for seq in range(start, self._next_seq)]
+        finally:
+            self.release()
+    
+    def _notify(self):
+        """Wake up stream listeners waiting for new entries"""
+        for loop, event in list(self._listeners):
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The listener's event loop is closed
+                self._listeners.discard((loop, event))
+    
+    async def wait_for_logs(self, after: int, timeout: float):
+        """Wait until an entry newer than `after` is logged or the timeout expires"""
+        if self.last_seq > after:
+            return
         
-        # Keep only the most recent logs
-        if len(self.logs) > self.max_logs:
-            self.logs = self.logs[-self.max_logs:]
+        listener = (asyncio.get_running_loop(), asyncio.Event())
+        self._listeners.add(listener)
+        try:
+            if self.last_seq > after:
+                return
+            await asyncio.wait_for(listener[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._listeners.discard(listener)
 
 # Create and add the memory handler to all agent loggers
 memory_handler = MemoryLogHandler()
@@ -83,6 +144,7 @@ class RunAgentResponse(BaseModel):
     github_pr_number: Optional[int] = None
     github_pr_url: Optional[str] = None
     incident_id: Optional[str] = None
+    results: Optional[List[Dict[str, Any]]] = None  # Per-pod results when several pods were remediated
     message: Optional[str] = None
     error: Optional[str] = None
 
@@ -94,6 +156,7 @@ class GetIncidentsRequest(BaseModel):
     namespace: Optional[str] = None
     since: Optional[int] = None
     limit: Optional[int] = None
+    cursor: Optional[str] = Field(None, description="next_cursor from the previous page")
 
 class IncidentResponse(BaseModel):
     """Response model for an incident"""
@@ -115,6 +178,7 @@ class GetIncidentsResponse(BaseModel):
     """Response model for getting incidents"""
     incidents: List[IncidentResponse]
     total: int
+    next_cursor: Optional[str] = None
 
 class GetRestartCountsResponse(BaseModel):
     """Response model for getting restart counts"""
@@ -131,25 +195,90 @@ class SimulateIssueResponse(BaseModel):
 
 # Global variables
 agent_running = False
+agent_run_pending = False  # A run is waiting in the queue
+agent_run_started_at = None
 last_run_time = 0
-run_interval = 30  # Run the agent every 30 seconds
+last_run_result = None
+last_run_trigger = None
+run_interval = 30  # Minimum time between manual runs
+# Alerts pushed to /api/alerts/webhook trigger runs immediately, so polling is only a safety net
+poll_interval = int(os.environ.get("AGENT_POLL_INTERVAL", "300"))
 auto_run_enabled = True  # Enable automatic agent runs
+pending_alert_analysis = None  # Issues from alerts waiting for the next alert run
+last_alert_time = None
+
+# The LangGraph workflow is synchronous (pod restarts, LLM calls), so runs execute on a
+# dedicated single-worker executor instead of the event loop
+agent_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent-run")
+agent_run_queue: Optional[asyncio.Queue] = None
+agent_run_lock = asyncio.Lock()
 
 # Background task to run the agent
-def run_agent_task():
-    """Run the agent in the background"""
-    global agent_running, last_run_time
+def run_agent_task(analysis: Optional[Dict[str, Any]] = None):
+    """Run the agent in the background, from the decide stage if an analysis is given"""
+    global agent_running, agent_run_started_at, last_run_time, last_run_result
     
     try:
         agent_running = True
-        result = run_agent()
-        last_run_time = time.time()
+        agent_run_started_at = time.time()
+        result = run_agent_from_analysis(analysis) if analysis is not None else run_agent()
+        last_run_result = result
         return result
     except Exception as e:
         logger.error(f"Error running agent: {str(e)}", exc_info=True)
-        return {"status": "error", "error": str(e)}
+        last_run_result = {"status": "error", "error": str(e)}
+        return last_run_result
     finally:
+        last_run_time = time.time()
         agent_running = False
+        agent_run_started_at = None
+
+def request_agent_run(trigger: str) -> bool:
+    """Queue an agent run; returns False if a run is already waiting in the queue"""
+    global agent_run_pending
+    
+    if agent_run_pending:
+        return False
+    
+    agent_run_pending = True
+    agent_run_queue.put_nowait(trigger)
+    return True
+
+def request_alert_run(issues: List[Dict[str, Any]]) -> bool:
+    """Queue an alert run; returns False if the issues were merged into one already waiting"""
+    global pending_alert_analysis
+    
+    if pending_alert_analysis is not None:
+        pending_alert_analysis["issues"].extend(issues)
+        return False
+    
+    pending_alert_analysis = {"issues": list(issues), "timestamp": int(time.time())}
+    agent_run_queue.put_nowait("alert")
+    return True
+
+# Agent run worker
+async def agent_run_worker():
+    """Execute queued agent runs one at a time on the agent executor"""
+    global agent_run_pending, last_run_trigger, pending_alert_analysis
+    
+    loop = asyncio.get_running_loop()
+    while True:
+        trigger = await agent_run_queue.get()
+        try:
+            # Single flight: only one run of the workflow at any time
+            async with agent_run_lock:
+                last_run_trigger = trigger
+                if trigger == "alert":
+                    # Take every issue that arrived while this run was waiting
+                    analysis, pending_alert_analysis = pending_alert_analysis, None
+                    await loop.run_in_executor(agent_executor, partial(run_agent_task, analysis))
+                else:
+                    agent_run_pending = False
+                    await loop.run_in_executor(agent_executor, run_agent_task)
+        except Exception as e:
+            logger.error(f"Error in agent run worker: {str(e)}", exc_info=True)
+        finally:
+            agent_run_queue.task_done()
 
 # Periodic agent runner
 async def periodic_agent_runner():
@@ -158,9 +287,9 @@ async def periodic_agent_runner():
     
     while True:
         try:
-            if auto_run_enabled and not agent_running and time.time() - last_run_time >= run_interval:
+            if auto_run_enabled and not agent_running and not agent_run_pending and time.time() - last_run_time >= poll_interval:
                 print(f"Auto-running agent at {time.strftime('%Y-%m-%d %H:%M:%S')}")
-                run_agent_task()
+                request_agent_run("periodic")
         except Exception as e:
             print(f"Error in periodic agent runner: {str(e)}")
         
@@ -168,11 +297,11 @@ async def periodic_agent_runner():
 
 # Routes
 @app.post("/api/agent/run", response_model=RunAgentResponse)
-async def api_run_agent(request: RunAgentRequest, background_tasks: BackgroundTasks):
+async def api_run_agent(request: RunAgentRequest):
     """Run the agent"""
     global agent_running, last_run_time
     
-    # Check if the agent is already running
+    # Check if the agent is already running; a forced run is queued behind the current one
     if agent_running and not request.force_run:
         return RunAgentResponse(
             status="error",
@@ -186,12 +315,16 @@ async def api_run_agent(request: RunAgentRequest, background_tasks: BackgroundTa
             error=f"Agent was run recently. Please wait {int(run_interval - (time.time() - last_run_time))} seconds before running again."
         )
     
-    # Run the agent in the background
-    background_tasks.add_task(run_agent_task)
+    # Queue the run for the agent executor
+    if not request_agent_run("manual"):
+        return RunAgentResponse(
+            status="success",
+            message="An agent run is already queued"
+        )
     
     return RunAgentResponse(
         status="success",
-        message="Agent is running in the background"
+        message="Agent run queued" if agent_running else "Agent is running in the background"
     )
 
 @app.get("/api/agent/status", response_model=Dict[str, Any])
@@ -199,9 +332,47 @@ async def api_agent_status():
     """Get the agent status"""
     return {
         "running": agent_running,
+        "pending": agent_run_pending,
+        "run_started_at": agent_run_started_at,
+        "last_run_trigger": last_run_trigger,
+        "last_run_result": last_run_result,
         "last_run_time": last_run_time,
         "run_interval": run_interval,
-        "auto_run_enabled": auto_run_enabled
+        "poll_interval": poll_interval,
+        "auto_run_enabled": auto_run_enabled,
+        "last_alert_time": last_alert_time,
+        "pending_alert_issues": len(pending_alert_analysis["issues"]) if pending_alert_analysis else 0,
+        "detector": detector.stats()
+    }
+
+@app.post("/api/alerts/webhook", response_model=Dict[str, Any])
+async def api_alert_webhook(request: Request):
+    """Receive Prometheus Alertmanager or Grafana alert notifications
+    
+    Firing alerts are turned into an analysis and handed straight to the decide
+    stage, skipping the monitor and analyze stages of a full run.
+    """
+    global last_alert_time
+    
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Alert payload must be a JSON object")
+    
+    analysis = analysis_from_alerts(payload)
+    issues = analysis["issues"]
+    if not issues:
+        return {"status": "ignored", "issues": 0}
+    
+    last_alert_time = time.time()
+    queued = request_alert_run(issues)
+    oracle_logger.info(f"Oracle received {len(issues)} issues from alert webhook")
+    
+    return {
+        "status": "queued" if queued else "merged",
+        "issues": len(issues)
     }
 
 @app.post("/api/agent/auto-run", response_model=Dict[str, Any])
@@ -218,18 +389,32 @@ async def api_set_auto_run(enabled: bool = True):
 @app.post("/api/incidents", response_model=GetIncidentsResponse)
 async def api_get_incidents(request: GetIncidentsRequest):
     """Get incidents"""
+    before = None
+    if request.cursor:
+        try:
+            before = decode_cursor(request.cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {request.cursor}")
+    
     incidents = get_incidents(
         resolved=request.resolved,
         incident_type=request.incident_type,
         pod_name=request.pod_name,
         namespace=request.namespace,
         since=request.since,
-        limit=request.limit
+        limit=request.limit,
+        before=before
     )
     
+    # Only a full page can have a next page
+    next_cursor = None
+    if request.limit and len(incidents) == request.limit:
+        next_cursor = encode_cursor(Incident(**incidents[-1]))
+    
     return GetIncidentsResponse(
         incidents=incidents,
-        total=len(incidents)
+        total=len(incidents),
+        next_cursor=next_cursor
     )
 
 @app.get("/api/incidents/{incident_id}", response_model=IncidentResponse)
@@ -305,21 +490,72 @@ async def health():
     return {"status": "ok"}
 
 @app.get("/api/logs")
-async def api_get_logs(limit: Optional[int] = None):
-    """Get agent logs"""
-    logs = memory_handler.logs
+async def api_get_logs(limit: Optional[int] = None, after: int = 0):
+    """Get agent logs, newest first
     
-    # Sort logs by timestamp (newest first)
-    logs = sorted(logs, key=lambda x: x["timestamp"], reverse=True)
-    
-    # Limit the number of logs if requested
-    if limit and limit > 0:
-        logs = logs[:limit]
+    Pass the last_seq of the previous response as `after` to only get new entries.
+    """
+    logs = memory_handler.read(after=after, limit=limit)
+    logs.reverse()
     
     return {
-        "logs": logs
+        "logs": logs,
+        "last_seq": memory_handler.last_seq
     }
 
+@app.get("/api/logs/stats")
+async def api_get_log_stats():
+    """Get structured logging payload statistics"""
+    return get_payload_stats()
+
+@app.get("/api/outbox/stats")
+async def api_get_outbox_stats():
+    """Get background side-effect queue statistics"""
+    return {
+        **outbox.stats(),
+        "annotations": annotation_coalescer.stats(),
+        "issue_index": issue_index.stats()
+    }
+
+@app.get("/api/llm-cache/stats")
+async def api_get_llm_cache_stats():
+    """Get LLM response cache statistics"""
+    return llm_cache.stats()
+
+@app.get("/api/logs/stream")
+async def api_stream_logs(request: Request, after: Optional[int] = None):
+    """Stream agent logs as server-sent events
+    
+    Resumes after the Last-Event-ID header (or `after`) when reconnecting; by
+    default only entries logged after the connection was opened are sent.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        cursor = int(last_event_id)
+    elif after is not None:
+        cursor = after
+    else:
+        cursor = memory_handler.last_seq
+    
+    async def event_stream():
+        nonlocal cursor
+        while not await request.is_disconnected():
+            await memory_handler.wait_for_logs(cursor, timeout=15)
+            entries = memory_handler.read(after=cursor)
+            if not entries:
+                # Keep-alive comment so proxies don't close an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            for entry in entries:
+                yield f"id: {entry['seq']}\nevent: log\ndata: {json.dumps(entry)}\n\n"
+            cursor = entries[-1]["seq"]
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -333,6 +569,26 @@ async def root():
 @app.on_event("startup")
 async def startup_event():
     """Run the agent on startup"""
+    global agent_run_queue
+    
+    # Start the agent run worker
+    agent_run_queue = asyncio.Queue()
+    asyncio.create_task(agent_run_worker())
+    
+    # Deliver side effects left in the outbox by a previous run
+    outbox.start()
+    
+    # Rebuild a missing issue index in the background before the first remediation needs it
+    ensure_issue_index()
+    
     # Start the periodic agent runner
     asyncio.create_task(periodic_agent_runner())
     print("Started periodic agent runner")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close pooled MCP connections and stop the outbox workers on shutdown"""
+    await async_mcp_manager.aclose()
+    agent_executor.shutdown(wait=False, cancel_futures=True)
+    annotation_coalescer.flush()
+    outbox.stop()
@@ -1,9 +1,12 @@
 import os
+import re
 import json
 import time
 import datetime
-from typing import Dict, List, Any, Optional, Union
-from dataclasses import dataclass, asdict, field
+import sqlite3
+import threading
+from typing import Dict, List, Any, Optional, Union, Tuple
+from dataclasses import dataclass, asdict, field, fields
 
 @dataclass
 class Incident:
@@ -23,78 +26,208 @@ class Incident:
     notes: Optional[str] = None
 
 class IncidentStore:
-    """Store for tracking incidents and restart counts"""
+    """Store for tracking incidents and restart counts
     
-    def __init__(self, data_file: str = "incidents.json"):
+    State is kept in memory. Every change is appended to a journal next to the
+    data file and fsynced, so a write costs O(1) regardless of history size.
+    Once the journal grows past compact_threshold entries it is folded into the
+    snapshot (the data file) with an atomic rename. Loading reads the snapshot
+    and replays the journal tail.
+    """
+    
+    def __init__(self, data_file: str = "incidents.json",
+                 compact_threshold: int = int(os.environ.get("INCIDENT_JOURNAL_COMPACT_THRESHOLD", "500")),
+                 fsync: bool = os.environ.get("INCIDENT_JOURNAL_FSYNC", "true").lower() == "true"):
         """Initialize incident store with data file path"""
         self.data_file = data_file
+        self.journal_file = f"{data_file}.journal"
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
         self.incidents: List[Incident] = []
         self.restart_counts: Dict[str, Dict[str, int]] = {}  # {date: {pod_name: count}}
+        self._incidents_by_id: Dict[str, Incident] = {}
+        self._journal = None
+        self._journal_entries = 0
+        self._lock = threading.RLock()
         self.load()
     
     def load(self):
-        """Load incidents and restart counts from data file"""
-        if os.path.exists(self.data_file):
+        """Load the snapshot and replay the journal on top of it"""
+        with self._lock:
+            self.incidents = []
+            self.restart_counts = {}
+            self._incidents_by_id = {}
+            
+            if os.path.exists(self.data_file):
+                try:
+                    with open(self.data_file, "r") as f:
+                        data = json.load(f)
+                        
+                        # Load incidents
+                        for incident in data.get("incidents", []):
+                            self._apply_add(Incident(**incident))
+                        
+                        # Load restart counts
+                        self.restart_counts = data.get("restart_counts", {})
+                except Exception as e:
+                    print(f"Error loading incident data: {e}")
+            
+            self._journal_entries = self._replay_journal()
+        
+        if self._journal_entries >= self.compact_threshold:
+            self.compact()
+    
+    def _replay_journal(self) -> int:
+        """Apply journal events to the in-memory state and return how many were applied"""
+        if not os.path.exists(self.journal_file):
+            return 0
+        
+        applied = 0
+        valid_bytes = 0
+        try:
+            with open(self.journal_file, "rb") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        # A torn write from a crash; everything after it is discarded
+                        print(f"Discarding corrupt incident journal tail at byte {valid_bytes}")
+                        break
+                    self._apply_event(event)
+                    applied += 1
+                    valid_bytes += len(line)
+            
+            if valid_bytes < os.path.getsize(self.journal_file):
+                with open(self.journal_file, "r+b") as f:
+                    f.truncate(valid_bytes)
+        except Exception as e:
+            print(f"Error replaying incident journal: {e}")
+        
+        return applied
+    
+    def _apply_event(self, event: Dict[str, Any]):
+        """Apply a single journal event; events are idempotent so replaying twice is safe"""
+        op = event.get("op")
+        if op == "add":
+            self._apply_add(Incident(**event["incident"]))
+        elif op == "update":
+            incident = self._incidents_by_id.get(event["id"])
+            if incident:
+                for key, value in event["fields"].items():
+                    setattr(incident, key, value)
+        elif op == "restart_count":
+            self.restart_counts.setdefault(event["date"], {})[event["pod"]] = event["count"]
+        elif op == "clear_restart_counts":
+            for date_str in event["dates"]:
+                self.restart_counts.pop(date_str, None)
+        else:
+            print(f"Ignoring unknown incident journal event: {op}")
+    
+    def _apply_add(self, incident: Incident):
+        """Add or replace an incident in memory"""
+        existing = self._incidents_by_id.get(incident.id)
+        if existing is not None:
+            self.incidents[self.incidents.index(existing)] = incident
+        else:
+            self.incidents.append(incident)
+        self._incidents_by_id[incident.id] = incident
+    
+    def _append(self, event: Dict[str, Any]):
+        """Append an event to the journal and compact once it grows too long"""
+        try:
+            if self._journal is None:
+                self._journal = open(self.journal_file, "a")
+            self._journal.write(json.dumps(event, separators=(",", ":")) + "\n")
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+            self._journal_entries += 1
+        except Exception as e:
+            print(f"Error writing incident journal: {e}")
+            return
+        
+        if self._journal_entries >= self.compact_threshold:
+            self.compact()
+    
+    def compact(self):
+        """Write the current state as a new snapshot and truncate the journal"""
+        with self._lock:
             try:
-                with open(self.data_file, "r") as f:
-                    data = json.load(f)
-                    
-                    # Load incidents
-                    self.incidents = [Incident(**incident) for incident in data.get("incidents", [])]
-                    
-                    # Load restart counts
-                    self.restart_counts = data.get("restart_counts", {})
+                data = {
+                    "incidents": [asdict(incident) for incident in self.incidents],
+                    "restart_counts": self.restart_counts
+                }
+                
+                tmp_file = f"{self.data_file}.tmp"
+                with open(tmp_file, "w") as f:
+                    json.dump(data, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_file, self.data_file)
+                self._fsync_directory()
+                
+                # Events already in the snapshot may be replayed again if we crash
+                # before the truncate below; that is harmless because they are idempotent
+                if self._journal is not None:
+                    self._journal.close()
+                    self._journal = None
+                with open(self.journal_file, "w") as f:
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._journal_entries = 0
             except Exception as e:
-                print(f"Error loading incident data: {e}")
+                print(f"Error compacting incident data: {e}")
+    
+    def _fsync_directory(self):
+        """Make the rename of the snapshot durable"""
+        directory = os.path.dirname(os.path.abspath(self.data_file))
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
     
     def save(self):
         """Save incidents and restart counts to data file"""
-        try:
-            data = {
-                "incidents": [asdict(incident) for incident in self.incidents],
-                "restart_counts": self.restart_counts
-            }
-            
-            with open(self.data_file, "w") as f:
-                json.dump(data, f, indent=2)
-        except Exception as e:
-            print(f"Error saving incident data: {e}")
+        self.compact()
     
     def add_incident(self, incident: Incident) -> Incident:
         """Add a new incident"""
-        self.incidents.append(incident)
-        self.save()
+        with self._lock:
+            self._apply_add(incident)
+            self._append({"op": "add", "incident": asdict(incident)})
         return incident
     
     def get_incident(self, incident_id: str) -> Optional[Incident]:
         """Get an incident by ID"""
-        for incident in self.incidents:
-            if incident.id == incident_id:
-                return incident
-        return None
+        return self._incidents_by_id.get(incident_id)
     
     def update_incident(self, incident_id: str, **kwargs) -> Optional[Incident]:
         """Update an incident"""
-        incident = self.get_incident(incident_id)
-        if incident:
-            for key, value in kwargs.items():
-                if hasattr(incident, key):
+        with self._lock:
+            incident = self.get_incident(incident_id)
+            if incident:
+                updates = {key: value for key, value in kwargs.items() if hasattr(incident, key)}
+                for key, value in updates.items():
                     setattr(incident, key, value)
-            self.save()
-            return incident
+                self._append({"op": "update", "id": incident_id, "fields": updates})
+                return incident
         return None
     
     def resolve_incident(self, incident_id: str, notes: Optional[str] = None) -> Optional[Incident]:
         """Resolve an incident"""
-        incident = self.get_incident(incident_id)
-        if incident:
-            incident.resolved = True
-            incident.resolved_timestamp = int(time.time())
-            if notes:
-                incident.notes = notes
-            self.save()
-            return incident
-        return None
+        updates = {
+            "resolved": True,
+            "resolved_timestamp": int(time.time())
+        }
+        if notes:
+            updates["notes"] = notes
+        return self.update_incident(incident_id, **updates)
     
     def get_incidents(self, 
                      resolved: Optional[bool] = None, 
@@ -102,8 +235,13 @@ class IncidentStore:
                      pod_name: Optional[str] = None,
                      namespace: Optional[str] = None,
                      since: Optional[int] = None,
-                     limit: Optional[int] = None) -> List[Incident]:
-        """Get incidents with optional filtering"""
+                     limit: Optional[int] = None,
+                     before: Optional[Tuple[int, str]] = None) -> List[Incident]:
+        """Get incidents with optional filtering
+        
+        Results are ordered newest first by (timestamp, id). Pass the
+        (timestamp, id) of the last incident of a page as `before` to get the next page.
+        """
         filtered = self.incidents
         
         if resolved is not None:
@@ -121,8 +259,11 @@ class IncidentStore:
         if since:
             filtered = [i for i in filtered if i.timestamp >= since]
         
+        if before:
+            filtered = [i for i in filtered if (i.timestamp, i.id) < tuple(before)]
+        
         # Sort by timestamp (newest first)
-        filtered = sorted(filtered, key=lambda i: i.timestamp, reverse=True)
+        filtered = sorted(filtered, key=lambda i: (i.timestamp, i.id), reverse=True)
         
         if limit:
             filtered = filtered[:limit]
@@ -132,19 +273,22 @@ class IncidentStore:
     def increment_restart_count(self, pod_name: str, namespace: str) -> int:
         """Increment restart count for a pod on the current date"""
         today = datetime.datetime.now().strftime("%Y-%m-%d")
-        
-        if today not in self.restart_counts:
-            self.restart_counts[today] = {}
-        
         pod_key = f"{namespace}/{pod_name}"
         
-        if pod_key not in self.restart_counts[today]:
-            self.restart_counts[today][pod_key] = 0
-        
-        self.restart_counts[today][pod_key] += 1
-        self.save()
+        with self._lock:
+            if today not in self.restart_counts:
+                self.restart_counts[today] = {}
+            
+            if pod_key not in self.restart_counts[today]:
+                self.restart_counts[today][pod_key] = 0
+            
+            self.restart_counts[today][pod_key] += 1
+            count = self.restart_counts[today][pod_key]
+            
+            # Journal the absolute count so replaying the event is idempotent
+            self._append({"op": "restart_count", "date": today, "pod": pod_key, "count": count})
         
-        return self.restart_counts[today][pod_key]
+        return count
     
     def get_restart_count(self, pod_name: str, namespace: str) -> int:
         """Get restart count for a pod on the current date"""
@@ -169,7 +313,7 @@ class IncidentStore:
         today = datetime.datetime.now().date()
         
         dates_to_remove = []
-        for date_str in self.restart_counts:
+        for date_str in list(self.restart_counts):
             try:
                 date = datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
                 days_old = (today - date).days
@@ -180,11 +324,462 @@ class IncidentStore:
                 # Invalid date format, remove it
                 dates_to_remove.append(date_str)
         
-        for date_str in dates_to_remove:
-            del self.restart_counts[date_str]
-        
         if dates_to_remove:
-            self.save()
+            with self._lock:
+                for date_str in dates_to_remove:
+                    self.restart_counts.pop(date_str, None)
+                self._append({"op": "clear_restart_counts", "dates": dates_to_remove})
+
+class SQLiteIncidentStore:
+    """Incident store backed by SQLite in WAL mode
+    
+    Exposes the same API as IncidentStore, but filtering, `since`, `limit` and
+    keyset pagination run as indexed queries instead of scanning the whole history.
+    """
+    
+    INCIDENT_COLUMNS = [f.name for f in fields(Incident)]
+    JSON_COLUMNS = {"metrics", "github_issue", "github_pr"}
+    
+    def __init__(self, db_file: str = "incidents.db", import_from: Optional[str] = "incidents.json"):
+        """Initialize the database, importing an existing JSON store on first use"""
+        self.db_file = db_file
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        
+        if import_from and self._is_empty() and (
+            os.path.exists(import_from) or os.path.exists(f"{import_from}.journal")
+        ):
+            self._import_json_store(import_from)
+    
+    def _create_schema(self):
+        """Create tables and indexes"""
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS incidents (
+                id TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                pod_name TEXT NOT NULL,
+                namespace TEXT NOT NULL,
+                timestamp INTEGER NOT NULL,
+                severity TEXT NOT NULL,
+                metrics TEXT NOT NULL,
+                action_taken TEXT,
+                github_issue TEXT,
+                github_pr TEXT,
+                resolved INTEGER NOT NULL DEFAULT 0,
+                resolved_timestamp INTEGER,
+                notes TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_incidents_timestamp ON incidents (timestamp DESC, id DESC);
+            CREATE INDEX IF NOT EXISTS idx_incidents_pod ON incidents (namespace, pod_name, timestamp DESC, id DESC);
+            CREATE INDEX IF NOT EXISTS idx_incidents_type ON incidents (type, timestamp DESC, id DESC);
+            CREATE INDEX IF NOT EXISTS idx_incidents_resolved ON incidents (resolved, timestamp DESC, id DESC);
+            CREATE TABLE IF NOT EXISTS restart_counts (
+                date TEXT NOT NULL,
+                pod TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (date, pod)
+            );
+        """)
+    
+    def _is_empty(self) -> bool:
+        """Check whether the database holds no data yet"""
+        row = self._conn.execute(
+            "SELECT (SELECT COUNT(*) FROM incidents) + (SELECT COUNT(*) FROM restart_counts)"
+        ).fetchone()
+        return row[0] == 0
+    
+    def _import_json_store(self, data_file: str):
+        """Import incidents and restart counts from a JSON (journal) store"""
+        json_store = IncidentStore(data_file)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for incident in json_store.incidents:
+                    self._insert(incident)
+                for date_str, counts in json_store.restart_counts.items():
+                    for pod_key, count in counts.items():
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO restart_counts (date, pod, count) VALUES (?, ?, ?)",
+                            (date_str, pod_key, count)
+                        )
+                self._conn.execute("COMMIT")
+                print(f"Imported {len(json_store.incidents)} incidents from {data_file}")
+            except Exception as e:
+                self._conn.execute("ROLLBACK")
+                print(f"Error importing incident data: {e}")
+    
+    def _to_row(self, incident: Incident) -> List[Any]:
+        """Convert an incident to column values"""
+        values = []
+        for column in self.INCIDENT_COLUMNS:
+            value = getattr(incident, column)
+            if column in self.JSON_COLUMNS and value is not None:
+                value = json.dumps(value)
+            elif column == "resolved":
+                value = int(bool(value))
+            values.append(value)
+        return values
+    
+    def _from_row(self, row: sqlite3.Row) -> Incident:
+        """Convert a database row to an incident"""
+        data = dict(row)
+        for column in self.JSON_COLUMNS:
+            if data[column] is not None:
+                data[column] = json.loads(data[column])
+        data["resolved"] = bool(data["resolved"])
+        return Incident(**data)
+    
+    def _insert(self, incident: Incident):
+        """Insert or replace an incident row"""
+        placeholders = ", ".join("?" for _ in self.INCIDENT_COLUMNS)
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO incidents ({', '.join(self.INCIDENT_COLUMNS)}) VALUES ({placeholders})",
+            self._to_row(incident)
+        )
+    
+    def load(self):
+        """Nothing to load; queries always read the database"""
+        pass
+    
+    def save(self):
+        """Nothing to save; every change is committed immediately"""
+        pass
+    
+    def add_incident(self, incident: Incident) -> Incident:
+        """Add a new incident"""
+        with self._lock:
+            self._insert(incident)
+        return incident
+    
+    def get_incident(self, incident_id: str) -> Optional[Incident]:
+        """Get an incident by ID"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM incidents WHERE id = ?", (incident_id,)).fetchone()
+        return self._from_row(row) if row else None
+    
+    def update_incident(self, incident_id: str, **kwargs) -> Optional[Incident]:
+        """Update an incident"""
+        with self._lock:
+            incident = self.get_incident(incident_id)
+            if incident:
+                for key, value in kwargs.items():
+                    if hasattr(incident, key):
+                        setattr(incident, key, value)
+                self._insert(incident)
+                return incident
+        return None
+    
+    def resolve_incident(self, incident_id: str, notes: Optional[str] = None) -> Optional[Incident]:
+        """Resolve an incident"""
+        updates = {
+            "resolved": True,
+            "resolved_timestamp": int(time.time())
+        }
+        if notes:
+            updates["notes"] = notes
+        return self.update_incident(incident_id, **updates)
+    
+    def get_incidents(self, 
+                     resolved: Optional[bool] = None, 
+                     incident_type: Optional[str] = None,
+                     pod_name: Optional[str] = None,
+                     namespace: Optional[str] = None,
+                     since: Optional[int] = None,
+                     limit: Optional[int] = None,
+                     before: Optional[Tuple[int, str]] = None) -> List[Incident]:
+        """Get incidents with optional filtering, newest first, using keyset pagination"""
+        conditions = []
+        params: List[Any] = []
+        
+        if resolved is not None:
+            conditions.append("resolved = ?")
+            params.append(int(resolved))
+        
+        if incident_type:
+            conditions.append("type = ?")
+            params.append(incident_type)
+        
+        if pod_name:
+            conditions.append("pod_name = ?")
+            params.append(pod_name)
+        
+        if namespace:
+            conditions.append("namespace = ?")
+            params.append(namespace)
+        
+        if since:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        
+        if before:
+            conditions.append("(timestamp, id) < (?, ?)")
+            params.extend(before)
+        
+        query = "SELECT * FROM incidents"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY timestamp DESC, id DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._from_row(row) for row in rows]
+    
+    def increment_restart_count(self, pod_name: str, namespace: str) -> int:
+        """Increment restart count for a pod on the current date"""
+        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        pod_key = f"{namespace}/{pod_name}"
+        
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT INTO restart_counts (date, pod, count) VALUES (?, ?, 1) "
+                    "ON CONFLICT (date, pod) DO UPDATE SET count = count + 1",
+                    (today, pod_key)
+                )
+                row = self._conn.execute(
+                    "SELECT count FROM restart_counts WHERE date = ? AND pod = ?", (today, pod_key)
+                ).fetchone()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        
+        return row["count"]
+    
+    def get_restart_count(self, pod_name: str, namespace: str) -> int:
+        """Get restart count for a pod on the current date"""
+        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT count FROM restart_counts WHERE date = ? AND pod = ?", (today, f"{namespace}/{pod_name}")
+            ).fetchone()
+        return row["count"] if row else 0
+    
+    def get_all_restart_counts(self) -> Dict[str, Dict[str, int]]:
+        """Get all restart counts"""
+        restart_counts: Dict[str, Dict[str, int]] = {}
+        with self._lock:
+            rows = self._conn.execute("SELECT date, pod, count FROM restart_counts").fetchall()
+        for row in rows:
+            restart_counts.setdefault(row["date"], {})[row["pod"]] = row["count"]
+        return restart_counts
+    
+    def clear_old_restart_counts(self, days_to_keep: int = 7):
+        """Clear restart counts older than specified days"""
+        today = datetime.datetime.now().date()
+        
+        with self._lock:
+            dates = [row["date"] for row in self._conn.execute("SELECT DISTINCT date FROM restart_counts")]
+            
+            dates_to_remove = []
+            for date_str in dates:
+                try:
+                    date = datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
+                    if (today - date).days > days_to_keep:
+                        dates_to_remove.append(date_str)
+                except ValueError:
+                    # Invalid date format, remove it
+                    dates_to_remove.append(date_str)
+            
+            if dates_to_remove:
+                self._conn.executemany("DELETE FROM restart_counts WHERE date = ?", [(d,) for d in dates_to_remove])
+
+# Marker embedded in issue bodies so the issue index can be rebuilt from GitHub
+FINGERPRINT_MARKER = "<!-- incident-fingerprint: {} -->"
+FINGERPRINT_PATTERN = re.compile(r"<!-- incident-fingerprint: (\S+) -->")
+
+def issue_fingerprint(namespace: str, pod_name: str, issue_type: str, day: Optional[str] = None) -> str:
+    """Get the fingerprint of an incident: namespace, pod, issue type and UTC day"""
+    day = day or datetime.datetime.utcnow().strftime("%Y-%m-%d")
+    return f"{namespace}/{pod_name}/{issue_type}/{day}"
+
+class IssueIndex:
+    """Maps incident fingerprints to the GitHub issue tracking them
+    
+    The first incident of a fingerprint opens an issue; repeats are attached to
+    that issue as comments instead of opening near-identical ones. While the
+    issue is still being created, repeats are collected on its entry and
+    posted as one comment once its number is known. The index is a small JSON
+    file next to the incident data, rewritten atomically on every change.
+    When the file is missing, needs_rebuild is set so the caller can rebuild
+    it from the fingerprint markers of open GitHub issues.
+    """
+    
+    def __init__(self, data_file: str = "issue_index.json",
+                 retention_days: int = int(os.environ.get("ISSUE_INDEX_RETENTION_DAYS", "2")),
+                 pending_timeout: float = float(os.environ.get("ISSUE_INDEX_PENDING_TIMEOUT", "3600"))):
+        """Initialize the index, loading its data file if it exists"""
+        self.data_file = data_file
+        self.retention_days = retention_days
+        self.pending_timeout = pending_timeout
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self.needs_rebuild = not os.path.exists(data_file)
+        
+        if not self.needs_rebuild:
+            try:
+                with open(data_file, "r") as f:
+                    self.entries = json.load(f)
+            except Exception as e:
+                print(f"Error loading issue index, rebuilding it: {e}")
+                self.needs_rebuild = True
+    
+    def _save(self):
+        """Write the index atomically"""
+        try:
+            tmp_file = f"{self.data_file}.tmp"
+            with open(tmp_file, "w") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_file, self.data_file)
+        except Exception as e:
+            print(f"Error saving issue index: {e}")
+    
+    def _prune(self):
+        """Drop entries for days older than retention_days"""
+        oldest = (datetime.datetime.utcnow() - datetime.timedelta(days=self.retention_days)).strftime("%Y-%m-%d")
+        for fingerprint in [fp for fp in self.entries if fp.rsplit("/", 1)[-1] < oldest]:
+            del self.entries[fingerprint]
+    
+    def track(self, fingerprint: str, incident_id: str, comment: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Record an incident and decide how to report it
+        
+        Returns ("create", None) when the incident should open a new issue,
+        ("comment", issue) when it should comment on an existing issue, and
+        ("pending", None) when the issue is still being created; the comment
+        is then kept and returned by resolve(). When an issue has been pending
+        for longer than pending_timeout, the incident opens a new one and the
+        held comments are kept for it, so resolve() still returns them.
+        """
+        with self._lock:
+            entry = self.entries.get(fingerprint)
+            stale = entry is not None and entry["issue"] is None and time.time() - entry["created"] > self.pending_timeout
+            
+            if entry is None or stale:
+                self._prune()
+                self.entries[fingerprint] = {
+                    "issue": None,
+                    "created": time.time(),
+                    "pending_incidents": entry["pending_incidents"] if stale else [],
+                    "pending_comments": entry["pending_comments"] if stale else []
+                }
+                decision, issue = "create", None
+            elif entry["issue"] is not None:
+                decision, issue = "comment", dict(entry["issue"])
+            else:
+                entry["pending_incidents"].append(incident_id)
+                entry["pending_comments"].append(comment)
+                decision, issue = "pending", None
+            
+            self._save()
+        return decision, issue
+    
+    def resolve(self, fingerprint: str, issue: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+        """Store the issue created for a fingerprint and return the incidents and comments waiting for it"""
+        with self._lock:
+            entry = self.entries.setdefault(fingerprint, {
+                "issue": None,
+                "created": time.time(),
+                "pending_incidents": [],
+                "pending_comments": []
+            })
+            entry["issue"] = {key: issue.get(key) for key in ("number", "title", "url", "html_url")}
+            pending = (entry["pending_incidents"], entry["pending_comments"])
+            entry["pending_incidents"], entry["pending_comments"] = [], []
+            self._save()
+        return pending
+    
+    def restart(self, fingerprint: str) -> Tuple[List[str], List[str]]:
+        """Take the incidents and comments held for a pending issue whose creation is being retried
+        
+        The entry stays pending, so repeats keep being held for the retried
+        issue, and its pending timeout starts over.
+        """
+        with self._lock:
+            entry = self.entries.get(fingerprint)
+            if entry is None or entry["issue"] is not None:
+                return [], []
+            entry["created"] = time.time()
+            pending = (entry["pending_incidents"], entry["pending_comments"])
+            entry["pending_incidents"], entry["pending_comments"] = [], []
+            self._save()
+        return pending
+    
+    def release(self, fingerprint: str) -> Tuple[List[str], List[str]]:
+        """Forget a pending issue that could not be created, so the next incident opens a new one
+        
+        Returns the incidents and comments that were held for it.
+        """
+        with self._lock:
+            entry = self.entries.get(fingerprint)
+            if entry is None or entry["issue"] is not None:
+                return [], []
+            del self.entries[fingerprint]
+            self._save()
+        return entry["pending_incidents"], entry["pending_comments"]
+    
+    def rebuild(self, issues: List[Dict[str, Any]]):
+        """Add the issues carrying a fingerprint marker; entries already in the index are kept"""
+        with self._lock:
+            added = 0
+            for issue in issues:
+                match = FINGERPRINT_PATTERN.search(issue.get("body") or "")
+                if match and match.group(1) not in self.entries:
+                    self.entries[match.group(1)] = {
+                        "issue": {key: issue.get(key) for key in ("number", "title", "url", "html_url")},
+                        "created": time.time(),
+                        "pending_incidents": [],
+                        "pending_comments": []
+                    }
+                    added += 1
+            self._prune()
+            self._save()
+            self.needs_rebuild = False
+        print(f"Rebuilt issue index with {added} issues from GitHub")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get index statistics"""
+        with self._lock:
+            return {
+                "fingerprints": len(self.entries),
+                "pending": sum(1 for entry in self.entries.values() if entry["issue"] is None),
+                "needs_rebuild": self.needs_rebuild
+            }
+
+def encode_cursor(incident: Incident) -> str:
+    """Encode the keyset pagination cursor pointing after an incident"""
+    return f"{incident.timestamp}:{incident.id}"
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    """Decode a keyset pagination cursor into (timestamp, id)"""
+    timestamp, incident_id = cursor.split(":", 1)
+    return int(timestamp), incident_id
+
+def create_incident_store() -> Union[IncidentStore, SQLiteIncidentStore]:
+    """Create the incident store selected by INCIDENT_STORE_BACKEND ("journal" or "sqlite")"""
+    backend = os.environ.get("INCIDENT_STORE_BACKEND", "journal").lower()
+    if backend == "sqlite":
+        return SQLiteIncidentStore(os.environ.get("INCIDENT_DB_FILE", "incidents.db"))
+    return IncidentStore()
 
 # Create a global instance of the incident store
-incident_store = IncidentStore()
+incident_store = create_incident_store()
+
+def add_incident_note(incident_id: str, note: str) -> Optional[Incident]:
+    """Append a line to the notes of an incident"""
+    incident = incident_store.get_incident(incident_id)
+    if incident is None:
+        return None
+    notes = f"{incident.notes}\n{note}" if incident.notes else note
+    return incident_store.update_incident(incident_id, notes=notes)
+
+# Create a global instance of the issue index
+issue_index = IssueIndex(os.environ.get("ISSUE_INDEX_FILE", "issue_index.json"))
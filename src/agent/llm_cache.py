@@ -0,0 +1,163 @@
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger("agent.smith")
+
+# LLM cache settings
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_DB_FILE = os.environ.get("LLM_CACHE_DB_FILE", "llm_cache.db")
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "500"))
+
+# Volatile parts of log lines that don't change their meaning
+LOG_NORMALIZERS = [
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<ts>"),
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.IGNORECASE), "<uuid>"),
+    (re.compile(r"\b0x[0-9a-f]+\b", re.IGNORECASE), "<hex>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<ip>"),
+    (re.compile(r"\d+(?:\.\d+)?"), "<n>"),
+]
+
+def normalize_logs(logs: str) -> str:
+    """Reduce logs to their signature by masking timestamps, IDs, addresses and numbers"""
+    lines = []
+    for line in logs.splitlines():
+        for pattern, replacement in LOG_NORMALIZERS:
+            line = pattern.sub(replacement, line)
+        line = line.strip()
+        if line:
+            lines.append(line)
+    return "\n".join(lines)
+
+def content_hash(text: str) -> str:
+    """SHA-256 of a text"""
+    return hashlib.sha256(text.encode("utf-8", errors="replace")).hexdigest()
+
+class LLMCache:
+    """Persistent content-addressed cache of LLM responses
+
+    Responses are stored in SQLite under a key derived from hashes of what
+    determines them: the step, the prompt version, the model, the issue type,
+    the code, the normalized logs and any other prompt inputs passed as extra
+    key parts (e.g. the pod name). Entries expire after LLM_CACHE_TTL
+    seconds and the least recently used ones are evicted beyond
+    LLM_CACHE_MAX_ENTRIES. Bump the prompt version whenever a prompt changes.
+    """
+
+    def __init__(self, db_file: str = LLM_CACHE_DB_FILE, ttl: float = LLM_CACHE_TTL,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES, enabled: bool = LLM_CACHE_ENABLED):
+        self.db_file = db_file
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                step TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used);
+        """)
+
+    def make_key(self, step: str, prompt_version: str, issue_type: str, code: str, logs: str,
+                 **extra: Any) -> str:
+        """Build the cache key of an LLM call from the hashes of its inputs"""
+        parts = {
+            "step": step,
+            "prompt_version": prompt_version,
+            "issue_type": issue_type,
+            "code": content_hash(code),
+            "logs": content_hash(normalize_logs(logs)),
+            **{name: value if isinstance(value, (int, float, bool)) or value is None else content_hash(str(value))
+               for name, value in extra.items()}
+        }
+        return content_hash(json.dumps(parts, sort_keys=True))
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached response, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if now - row["created"] > self.ttl:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE llm_cache SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self.hits += 1
+            return row["response"]
+
+    def put(self, key: str, step: str, response: str):
+        """Store a response, evicting expired and least recently used entries"""
+        if not self.enabled:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, step, response, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, step, response, now, now)
+            )
+            self.expired += self._conn.execute("DELETE FROM llm_cache WHERE created < ?", (now - self.ttl,)).rowcount
+            self.evictions += self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+
+    def invalidate(self, key: str):
+        """Drop a cached response, e.g. one that turned out to be unusable"""
+        with self._lock:
+            self.invalidations += self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,)).rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) AS entries, COALESCE(SUM(LENGTH(response)), 0) AS bytes FROM llm_cache"
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": row["entries"],
+                "bytes": row["bytes"],
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "ttl": self.ttl,
+                "max_entries": self.max_entries
+            }
+
+# Create a global instance of the LLM cache
+llm_cache = LLMCache()
@@ -1,7 +1,10 @@
 import os
 import json
 import time
+import asyncio
 import logging
+import threading
+import httpx
 import requests
 from typing import Dict, List, Any, Optional, Union
 from requests.adapters import HTTPAdapter
@@ -10,16 +13,61 @@ from urllib3.util.retry import Retry
 # Configure logging
 logger = logging.getLogger("agent.mcp_client")
 
+# Environment variables holding the URL of each MCP server
+MCP_SERVER_ENV_VARS = {
+    "kubernetes": "KUBERNETES_MCP_URL",
+    "prometheus": "PROMETHEUS_MCP_URL",
+    "grafana": "GRAFANA_MCP_URL",
+    "github": "GITHUB_MCP_URL"
+}
+
+# How long a fetched schema is trusted before it is revalidated, and how long to
+# wait before retrying a schema fetch that failed
+SCHEMA_TTL = float(os.environ.get("MCP_SCHEMA_TTL", "300"))
+SCHEMA_RETRY_INTERVAL = float(os.environ.get("MCP_SCHEMA_RETRY_INTERVAL", "10"))
+
+class MCPSchema:
+    """Name-keyed view of an MCP server schema"""
+    
+    def __init__(self, schema: Optional[Dict[str, Any]] = None, etag: Optional[str] = None):
+        """Index the tools and resources of a raw schema"""
+        self.raw = schema or {"tools": [], "resources": []}
+        self.tools: Dict[str, Dict[str, Any]] = {
+            tool.get("name"): tool for tool in self.raw.get("tools", [])
+        }
+        self.resources: Dict[str, Dict[str, Any]] = {
+            resource.get("uri"): resource for resource in self.raw.get("resources", [])
+        }
+        self.etag = etag
+        self.fetched_at = time.monotonic()
+    
+    def is_fresh(self, ttl: float) -> bool:
+        """Check whether the schema is younger than the TTL"""
+        return time.monotonic() - self.fetched_at < ttl
+    
+    def touch(self):
+        """Mark the schema as revalidated"""
+        self.fetched_at = time.monotonic()
+
 class MCPClient:
     """Client for interacting with MCP servers"""
     
-    def __init__(self, server_url: str, max_retries: int = 3, retry_backoff: float = 0.5):
-        """Initialize MCP client with server URL"""
+    def __init__(self, server_url: str, max_retries: int = 3, retry_backoff: float = 0.5,
+                 schema_ttl: float = SCHEMA_TTL, schema_retry_interval: float = SCHEMA_RETRY_INTERVAL):
+        """Initialize MCP client with server URL
+        
+        The schema is not fetched here; it is loaded on first use so that an
+        unreachable server does not delay agent startup.
+        """
         self.server_url = server_url.rstrip("/")
         self.max_retries = max_retries
         self.retry_backoff = retry_backoff
+        self.schema_ttl = schema_ttl
+        self.schema_retry_interval = schema_retry_interval
         self.session = self._create_session()
-        self.schema = self._get_schema()
+        self._schema: Optional[MCPSchema] = None
+        self._schema_retry_at = 0.0
+        self._schema_lock = threading.Lock()
     
     def _create_session(self) -> requests.Session:
         """Create a requests session with retry logic"""
@@ -39,29 +87,57 @@ class MCPClient:
         
         return session
     
-    def _get_schema(self) -> Dict[str, Any]:
-        """Get the MCP schema from the server"""
-        try:
-            logger.info(f"Getting schema from {self.server_url}")
-            response = self.session.get(f"{self.server_url}/mcp/schema")
-            response.raise_for_status()
-            schema = response.json()
-            logger.info(f"Got schema with {len(schema.get('tools', []))} tools and {len(schema.get('resources', []))} resources")
+    @property
+    def schema(self) -> Dict[str, Any]:
+        """Get the raw MCP schema, fetching it if needed"""
+        return self._get_schema().raw
+    
+    def _get_schema(self, force_refresh: bool = False) -> MCPSchema:
+        """Get the MCP schema, fetching or revalidating it when it is missing or stale
+        
+        A failed fetch is never cached: the previous schema (or an empty one) is
+        returned and the fetch is retried after schema_retry_interval seconds.
+        """
+        schema = self._schema
+        # A forced refresh (unknown tool or resource) is rate limited by the retry interval
+        ttl = self.schema_retry_interval if force_refresh else self.schema_ttl
+        if schema is not None and schema.is_fresh(ttl):
             return schema
-        except requests.RequestException as e:
-            logger.error(f"Error getting MCP schema: {e}", exc_info=True)
-            return {"tools": [], "resources": []}
+        if time.monotonic() < self._schema_retry_at:
+            return schema or MCPSchema()
+        
+        with self._schema_lock:
+            # Another thread may have refreshed the schema while we were waiting
+            if self._schema is not schema:
+                return self._schema
+            
+            headers = {}
+            if schema is not None and schema.etag:
+                headers["If-None-Match"] = schema.etag
+            
+            try:
+                logger.info(f"Getting schema from {self.server_url}")
+                response = self.session.get(f"{self.server_url}/mcp/schema", headers=headers)
+                if response.status_code == 304 and schema is not None:
+                    schema.touch()
+                    return schema
+                response.raise_for_status()
+                self._schema = MCPSchema(response.json(), response.headers.get("ETag"))
+                logger.info(f"Got schema with {len(self._schema.tools)} tools and {len(self._schema.resources)} resources")
+                return self._schema
+            except (requests.RequestException, ValueError) as e:
+                logger.error(f"Error getting MCP schema: {e}", exc_info=True)
+                self._schema_retry_at = time.monotonic() + self.schema_retry_interval
+                return schema or MCPSchema()
     
     def use_tool(self, tool_name: str, arguments: Dict[str, Any], retry_count: int = 0) -> Dict[str, Any]:
         """Use an MCP tool with retry logic"""
-        # Check if tool exists in schema
-        tool_exists = False
-        for tool in self.schema.get("tools", []):
-            if tool.get("name") == tool_name:
-                tool_exists = True
-                break
-        
-        if not tool_exists:
+        # Check if tool exists in schema, refreshing once in case it was added since the last fetch
+        schema = self._get_schema()
+        if tool_name not in schema.tools:
+            schema = self._get_schema(force_refresh=True)
+        
+        if tool_name not in schema.tools:
             logger.error(f"Tool '{tool_name}' not found in MCP schema")
             raise ValueError(f"Tool '{tool_name}' not found in MCP schema")
         
@@ -107,14 +183,12 @@ class MCPClient:
     
     def access_resource(self, resource_uri: str, retry_count: int = 0) -> Dict[str, Any]:
         """Access an MCP resource with retry logic"""
-        # Check if resource exists in schema
-        resource_exists = False
-        for resource in self.schema.get("resources", []):
-            if resource.get("uri") == resource_uri:
-                resource_exists = True
-                break
-        
-        if not resource_exists:
+        # Check if resource exists in schema, refreshing once in case it was added since the last fetch
+        schema = self._get_schema()
+        if resource_uri not in schema.resources:
+            schema = self._get_schema(force_refresh=True)
+        
+        if resource_uri not in schema.resources:
             logger.error(f"Resource '{resource_uri}' not found in MCP schema")
             raise ValueError(f"Resource '{resource_uri}' not found in MCP schema")
         
@@ -206,5 +280,232 @@ class MCPClientManager:
             logger.error(f"Error accessing resource '{resource_uri}' on server '{server_name}': {e}", exc_info=True)
             return {"error": str(e)}
 
+class AsyncMCPClient:
+    """Asyncio-native client for interacting with MCP servers
+    
+    Mirrors the MCPClient surface (use_tool/access_resource) but keeps a pool of
+    keep-alive connections per server and bounds the number of in-flight requests.
+    Calls are regular coroutines, so they can be cancelled or wrapped in asyncio.wait_for.
+    """
+    
+    def __init__(self, server_url: str, max_retries: int = 3, retry_backoff: float = 0.5,
+                 max_connections: int = 20, max_keepalive_connections: int = 10,
+                 max_in_flight: int = 10, timeout: float = 30.0,
+                 schema_ttl: float = SCHEMA_TTL, schema_retry_interval: float = SCHEMA_RETRY_INTERVAL):
+        """Initialize async MCP client with server URL"""
+        self.server_url = server_url.rstrip("/")
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.timeout = timeout
+        self.schema_ttl = schema_ttl
+        self.schema_retry_interval = schema_retry_interval
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections
+        )
+        self.max_in_flight = max_in_flight
+        self._schema: Optional[MCPSchema] = None
+        self._schema_retry_at = 0.0
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._schema_lock: Optional[asyncio.Lock] = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the pooled HTTP client, creating it on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.server_url,
+                limits=self.limits,
+                timeout=self.timeout
+            )
+            # Created lazily so they bind to the event loop that actually uses the client
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._schema_lock = asyncio.Lock()
+        return self._client
+    
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Send a request through the pool, respecting the in-flight limit"""
+        client = self._get_client()
+        async with self._semaphore:
+            response = await client.request(method, path, **kwargs)
+        if response.status_code != 304:
+            response.raise_for_status()
+        return response
+    
+    async def _get_schema(self, force_refresh: bool = False) -> MCPSchema:
+        """Get the MCP schema, fetching or revalidating it when it is missing or stale
+        
+        Follows the same caching rules as MCPClient._get_schema.
+        """
+        schema = self._schema
+        ttl = self.schema_retry_interval if force_refresh else self.schema_ttl
+        if schema is not None and schema.is_fresh(ttl):
+            return schema
+        if time.monotonic() < self._schema_retry_at:
+            return schema or MCPSchema()
+        
+        self._get_client()
+        async with self._schema_lock:
+            # Another task may have refreshed the schema while we were waiting
+            if self._schema is not schema:
+                return self._schema
+            
+            headers = {}
+            if schema is not None and schema.etag:
+                headers["If-None-Match"] = schema.etag
+            
+            try:
+                logger.info(f"Getting schema from {self.server_url}")
+                response = await self._request("GET", "/mcp/schema", headers=headers)
+                if response.status_code == 304 and schema is not None:
+                    schema.touch()
+                    return schema
+                self._schema = MCPSchema(response.json(), response.headers.get("ETag"))
+                logger.info(f"Got schema with {len(self._schema.tools)} tools and {len(self._schema.resources)} resources")
+                return self._schema
+            except (httpx.HTTPError, ValueError) as e:
+                logger.error(f"Error getting MCP schema: {e}", exc_info=True)
+                self._schema_retry_at = time.monotonic() + self.schema_retry_interval
+                return schema or MCPSchema()
+    
+    def _should_retry(self, exception: httpx.HTTPError) -> bool:
+        """Determine if we should retry based on the exception"""
+        if isinstance(exception, httpx.HTTPStatusError):
+            status_code = exception.response.status_code
+            # Retry on server errors and rate limiting
+            return status_code >= 500 or status_code == 429
+        # Retry on connection errors and timeouts
+        return isinstance(exception, httpx.TransportError)
+    
+    def _error_response(self, exception: httpx.HTTPError) -> Dict[str, Any]:
+        """Convert an HTTP error into an MCP error response"""
+        if isinstance(exception, httpx.HTTPStatusError):
+            try:
+                error_data = exception.response.json()
+                return {"error": error_data.get("detail", str(exception))}
+            except ValueError:
+                return {"error": str(exception)}
+        return {"error": str(exception)}
+    
+    async def _call_with_retry(self, description: str, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        """Call the server, retrying with exponential backoff on transient errors"""
+        retry_count = 0
+        while True:
+            try:
+                response = await self._request(method, path, **kwargs)
+                return response.json()
+            except httpx.HTTPError as e:
+                logger.error(f"Error {description}: {e}", exc_info=True)
+                
+                if retry_count < self.max_retries and self._should_retry(e):
+                    retry_count += 1
+                    wait_time = self.retry_backoff * (2 ** (retry_count - 1))
+                    logger.info(f"Retrying {description} in {wait_time:.2f} seconds (attempt {retry_count}/{self.max_retries})")
+                    await asyncio.sleep(wait_time)
+                    continue
+                
+                return self._error_response(e)
+    
+    async def use_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Use an MCP tool with retry logic"""
+        # Check if tool exists in schema, refreshing once in case it was added since the last fetch
+        schema = await self._get_schema()
+        if tool_name not in schema.tools:
+            schema = await self._get_schema(force_refresh=True)
+        
+        if tool_name not in schema.tools:
+            logger.error(f"Tool '{tool_name}' not found in MCP schema")
+            raise ValueError(f"Tool '{tool_name}' not found in MCP schema")
+        
+        logger.info(f"Using tool '{tool_name}' with arguments: {json.dumps(arguments)}")
+        result = await self._call_with_retry(
+            f"using MCP tool '{tool_name}'", "POST", f"/mcp/tools/{tool_name}", json=arguments
+        )
+        if "error" not in result:
+            logger.info(f"Tool '{tool_name}' executed successfully")
+        return result
+    
+    async def access_resource(self, resource_uri: str) -> Dict[str, Any]:
+        """Access an MCP resource with retry logic"""
+        # Check if resource exists in schema, refreshing once in case it was added since the last fetch
+        schema = await self._get_schema()
+        if resource_uri not in schema.resources:
+            schema = await self._get_schema(force_refresh=True)
+        
+        if resource_uri not in schema.resources:
+            logger.error(f"Resource '{resource_uri}' not found in MCP schema")
+            raise ValueError(f"Resource '{resource_uri}' not found in MCP schema")
+        
+        logger.info(f"Accessing resource '{resource_uri}'")
+        result = await self._call_with_retry(
+            f"accessing MCP resource '{resource_uri}'", "GET", f"/mcp/resources/{resource_uri}"
+        )
+        if "error" not in result:
+            logger.info(f"Resource '{resource_uri}' accessed successfully")
+        return result
+    
+    async def aclose(self):
+        """Close the connection pool"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+class AsyncMCPClientManager:
+    """Manager for multiple async MCP clients"""
+    
+    def __init__(self):
+        """Initialize async MCP client manager"""
+        self.clients: Dict[str, AsyncMCPClient] = {}
+        
+        # Initialize clients from environment variables
+        for server_name, env_var in MCP_SERVER_ENV_VARS.items():
+            server_url = os.environ.get(env_var)
+            if server_url:
+                logger.info(f"Initializing async {server_name} MCP client with URL: {server_url}")
+                self.clients[server_name] = AsyncMCPClient(server_url)
+    
+    def get_client(self, server_name: str) -> AsyncMCPClient:
+        """Get an async MCP client by server name"""
+        if server_name not in self.clients:
+            logger.error(f"MCP client for server '{server_name}' not found")
+            raise ValueError(f"MCP client for server '{server_name}' not found")
+        return self.clients[server_name]
+    
+    def add_client(self, server_name: str, server_url: str) -> AsyncMCPClient:
+        """Add a new async MCP client"""
+        logger.info(f"Adding new async MCP client for server '{server_name}' with URL: {server_url}")
+        client = AsyncMCPClient(server_url)
+        self.clients[server_name] = client
+        return client
+    
+    async def use_tool(self, server_name: str, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Use an MCP tool on a specific server"""
+        try:
+            client = self.get_client(server_name)
+            return await client.use_tool(tool_name, arguments)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error using tool '{tool_name}' on server '{server_name}': {e}", exc_info=True)
+            return {"error": str(e)}
+    
+    async def access_resource(self, server_name: str, resource_uri: str) -> Dict[str, Any]:
+        """Access an MCP resource on a specific server"""
+        try:
+            client = self.get_client(server_name)
+            return await client.access_resource(resource_uri)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error accessing resource '{resource_uri}' on server '{server_name}': {e}", exc_info=True)
+            return {"error": str(e)}
+    
+    async def aclose(self):
+        """Close the connection pools of all clients"""
+        await asyncio.gather(*(client.aclose() for client in self.clients.values()))
+
 # Create a global instance of the MCP client manager
 mcp_manager = MCPClientManager()
+
+# Create a global instance of the async MCP client manager
+async_mcp_manager = AsyncMCPClientManager()
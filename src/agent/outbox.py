@@ -0,0 +1,318 @@
+import os
+import json
+import time
+import random
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Callable
+
+from mcp_client import mcp_manager
+
+logger = logging.getLogger("agent.outbox")
+
+# Outbox settings
+OUTBOX_DB_FILE = os.environ.get("OUTBOX_DB_FILE", "outbox.db")
+OUTBOX_WORKERS = int(os.environ.get("OUTBOX_WORKERS", "2"))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BACKOFF_BASE = float(os.environ.get("OUTBOX_BACKOFF_BASE", "1"))  # Seconds before the first retry
+OUTBOX_BACKOFF_MAX = float(os.environ.get("OUTBOX_BACKOFF_MAX", "300"))
+OUTBOX_RETENTION_SECONDS = float(os.environ.get("OUTBOX_RETENTION_SECONDS", "604800"))  # Keep delivered entries a week
+OUTBOX_FAILED_KEYS_SHOWN = int(os.environ.get("OUTBOX_FAILED_KEYS_SHOWN", "20"))  # Most recent failed entries in stats()
+
+class Outbox:
+    """Durable queue of MCP side effects delivered by background workers
+
+    Side effects that the agent does not need to wait for (GitHub issues,
+    Grafana annotations) are written to SQLite and return immediately. Worker
+    threads deliver them with exponential backoff until they succeed or run
+    out of attempts. Every entry has a key, and enqueueing a key that is
+    already in the outbox is a no-op. That only dedupes what shares a key:
+    callers key entries by incident id, which is new on every tick, so a
+    rerun tick queues new entries. Repeat GitHub issues are instead avoided
+    by the issue index, which turns repeats into comments.
+
+    Delivery is at least once: entries that were in flight when the process
+    stopped are delivered again on the next start. An entry may name a
+    completion handler (see register_handler) that is called with the tool
+    result, e.g. to store the created GitHub issue on its incident. A handler
+    may come with a failure handler that is called when the entry runs out of
+    attempts, so the owner of the side effect learns that it was dropped.
+    Failed entries are kept and listed by stats().
+    """
+
+    def __init__(self, db_file: str = OUTBOX_DB_FILE, workers: int = OUTBOX_WORKERS,
+                 client=mcp_manager, max_attempts: int = OUTBOX_MAX_ATTEMPTS):
+        """Open the database and requeue entries that were in flight"""
+        self.db_file = db_file
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.client = client
+        self._lock = threading.RLock()
+        self._wakeup = threading.Condition(self._lock)
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._handlers: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], None]] = {}
+        self._failure_handlers: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], None]] = {}
+        self._last_prune = 0.0
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+        self.handler_errors = 0
+        self.total_delivery_seconds = 0.0
+
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+        requeued = self._conn.execute("UPDATE outbox SET status = 'pending' WHERE status = 'running'").rowcount
+        if requeued:
+            logger.info(f"Outbox requeued {requeued} entries that were in flight")
+
+    def _create_schema(self):
+        """Create tables and indexes"""
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL UNIQUE,
+                server TEXT NOT NULL,
+                tool TEXT NOT NULL,
+                arguments TEXT NOT NULL,
+                handler TEXT,
+                context TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL,
+                last_error TEXT,
+                result TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt);
+        """)
+
+    def register_handler(self, name: str, handler: Callable[[Dict[str, Any], Dict[str, Any]], None],
+                         on_failure: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None):
+        """Register a completion handler called as handler(result, context) after delivery
+
+        on_failure is called as on_failure(failure, context) when an entry
+        naming this handler is given up on. failure holds the entry's key,
+        server, tool, arguments, attempts and last error.
+        """
+        self._handlers[name] = handler
+        if on_failure is not None:
+            self._failure_handlers[name] = on_failure
+
+    def enqueue(self, key: str, server: str, tool: str, arguments: Dict[str, Any],
+                handler: Optional[str] = None, context: Optional[Dict[str, Any]] = None) -> bool:
+        """Queue a tool call for background delivery; returns False if the key was already queued"""
+        now = time.time()
+        with self._lock:
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO outbox (key, server, tool, arguments, handler, context, next_attempt, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, server, tool, json.dumps(arguments), handler,
+                 json.dumps(context) if context is not None else None, now, now, now)
+            ).rowcount == 1
+            if inserted:
+                self._wakeup.notify()
+
+        if inserted:
+            logger.info(f"Outbox queued {server}.{tool} as {key}")
+        else:
+            logger.info(f"Outbox already has {key}, not queueing it again")
+
+        self.start()
+        return inserted
+
+    def start(self):
+        """Start the delivery workers if they are not running yet"""
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping = False
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"outbox-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        logger.info(f"Outbox started {self.workers} delivery workers")
+
+    def stop(self, timeout: float = 5):
+        """Stop the workers; undelivered entries stay queued for the next start"""
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify_all()
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout)
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        """Take the next due entry, marking it as running"""
+        row = self._conn.execute(
+            "SELECT * FROM outbox WHERE status = 'pending' AND next_attempt <= ? ORDER BY next_attempt, id LIMIT 1",
+            (time.time(),)
+        ).fetchone()
+        if row is not None:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'running', attempts = attempts + 1, updated = ? WHERE id = ?",
+                (time.time(), row["id"])
+            )
+        return row
+
+    def _next_due(self) -> Optional[float]:
+        """Get the time the next pending entry becomes due"""
+        row = self._conn.execute("SELECT MIN(next_attempt) FROM outbox WHERE status = 'pending'").fetchone()
+        return row[0]
+
+    def _run(self):
+        """Worker loop: deliver due entries, sleeping until the next one is due"""
+        while True:
+            with self._lock:
+                if self._stopping:
+                    return
+                self._prune()
+                entry = self._claim()
+                if entry is None:
+                    next_due = self._next_due()
+                    timeout = 60.0 if next_due is None else max(0.0, next_due - time.time())
+                    self._wakeup.wait(min(timeout, 60.0))
+                    continue
+
+            self._deliver(entry)
+
+    def _deliver(self, entry: sqlite3.Row):
+        """Call the tool for one entry and record the outcome"""
+        attempt = entry["attempts"] + 1
+        try:
+            result = self.client.use_tool(entry["server"], entry["tool"], json.loads(entry["arguments"]))
+            error = result.get("error") if isinstance(result, dict) else None
+        except Exception as e:
+            result, error = None, str(e)
+
+        now = time.time()
+        if error is None:
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE outbox SET status = 'done', result = ?, last_error = NULL, updated = ? WHERE id = ?",
+                    (json.dumps(result), now, entry["id"])
+                )
+                self.delivered += 1
+                self.total_delivery_seconds += now - entry["created"]
+            logger.info(f"Outbox delivered {entry['key']} after {attempt} attempts in {now - entry['created']:.2f}s")
+            self._complete(entry, result)
+            return
+
+        if attempt >= self.max_attempts:
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE outbox SET status = 'failed', last_error = ?, updated = ? WHERE id = ?",
+                    (error, now, entry["id"])
+                )
+                self.failed += 1
+            logger.error(f"Outbox gave up on {entry['key']} after {attempt} attempts: {error}")
+            self._fail(entry, attempt, error)
+            return
+
+        with self._lock:
+            # Exponential backoff with full jitter so workers don't retry in lockstep
+            delay = random.uniform(0, min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * (2 ** (attempt - 1))))
+            self._conn.execute(
+                "UPDATE outbox SET status = 'pending', last_error = ?, next_attempt = ?, updated = ? WHERE id = ?",
+                (error, now + delay, now, entry["id"])
+            )
+            self.retried += 1
+            self._wakeup.notify()
+        logger.warning(f"Outbox attempt {attempt} for {entry['key']} failed, retrying in {delay:.2f}s: {error}")
+
+    def _complete(self, entry: sqlite3.Row, result: Dict[str, Any]):
+        """Run the completion handler of a delivered entry"""
+        if not entry["handler"]:
+            return
+        handler = self._handlers.get(entry["handler"])
+        if handler is None:
+            logger.error(f"Outbox has no handler '{entry['handler']}' for {entry['key']}")
+            self.handler_errors += 1
+            return
+        try:
+            handler(result, json.loads(entry["context"]) if entry["context"] else {})
+        except Exception as e:
+            logger.error(f"Outbox handler '{entry['handler']}' failed for {entry['key']}: {str(e)}", exc_info=True)
+            self.handler_errors += 1
+
+    def _fail(self, entry: sqlite3.Row, attempts: int, error: str):
+        """Run the failure handler of an entry that was given up on"""
+        if not entry["handler"]:
+            return
+        on_failure = self._failure_handlers.get(entry["handler"])
+        if on_failure is None:
+            return
+        failure = {
+            "key": entry["key"],
+            "server": entry["server"],
+            "tool": entry["tool"],
+            "arguments": json.loads(entry["arguments"]),
+            "attempts": attempts,
+            "error": error
+        }
+        try:
+            on_failure(failure, json.loads(entry["context"]) if entry["context"] else {})
+        except Exception as e:
+            logger.error(f"Outbox failure handler '{entry['handler']}' failed for {entry['key']}: {str(e)}", exc_info=True)
+            self.handler_errors += 1
+
+    def _prune(self):
+        """Delete delivered entries older than OUTBOX_RETENTION_SECONDS"""
+        now = time.time()
+        if now - self._last_prune < 3600:
+            return
+        self._last_prune = now
+        self._conn.execute(
+            "DELETE FROM outbox WHERE status = 'done' AND updated < ?", (now - OUTBOX_RETENTION_SECONDS,)
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get an entry by idempotency key"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM outbox WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        for column in ("arguments", "context", "result"):
+            if entry[column] is not None:
+                entry[column] = json.loads(entry[column])
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth and delivery statistics"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS count FROM outbox GROUP BY status").fetchall()
+            oldest = self._conn.execute("SELECT MIN(created) FROM outbox WHERE status IN ('pending', 'running')").fetchone()[0]
+            failed = self._conn.execute(
+                "SELECT key, tool, attempts, last_error, updated FROM outbox WHERE status = 'failed' "
+                "ORDER BY updated DESC LIMIT ?", (OUTBOX_FAILED_KEYS_SHOWN,)
+            ).fetchall()
+            return {
+                "entries": {row["status"]: row["count"] for row in rows},
+                "oldest_pending_age": round(time.time() - oldest, 3) if oldest is not None else None,
+                "delivered": self.delivered,
+                "retried": self.retried,
+                "failed": self.failed,
+                "handler_errors": self.handler_errors,
+                "failed_keys": [
+                    {
+                        "key": row["key"],
+                        "tool": row["tool"],
+                        "attempts": row["attempts"],
+                        "error": row["last_error"],
+                        "failed_at": row["updated"]
+                    }
+                    for row in failed
+                ],
+                "avg_delivery_seconds": round(self.total_delivery_seconds / self.delivered, 3) if self.delivered else None,
+                "workers": len(self._threads)
+            }
+
+# Create a global instance of the outbox
+outbox = Outbox()
@@ -0,0 +1,172 @@
+import os
+import time
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sub_agents.logger import seer_logger
+
+# Detector settings
+DETECTOR_ALPHA = float(os.environ.get("DETECTOR_ALPHA", "0.1"))  # EWMA weight of a new sample
+DETECTOR_ANOMALY_ALPHA_FACTOR = float(os.environ.get("DETECTOR_ANOMALY_ALPHA_FACTOR", "0.1"))  # Baseline adapts slower during anomalies
+DETECTOR_Z_THRESHOLD = float(os.environ.get("DETECTOR_Z_THRESHOLD", "3"))
+DETECTOR_MIN_RELATIVE_STD = float(os.environ.get("DETECTOR_MIN_RELATIVE_STD", "0.05"))  # Noise floor as a fraction of the baseline
+DETECTOR_WARMUP_SAMPLES = int(os.environ.get("DETECTOR_WARMUP_SAMPLES", "10"))
+DETECTOR_SUSTAIN_TICKS = int(os.environ.get("DETECTOR_SUSTAIN_TICKS", "2"))
+DETECTOR_SEASON_SECONDS = float(os.environ.get("DETECTOR_SEASON_SECONDS", "86400"))
+DETECTOR_SEASON_BUCKETS = int(os.environ.get("DETECTOR_SEASON_BUCKETS", "24"))
+DETECTOR_SEASONAL_ALPHA = float(os.environ.get("DETECTOR_SEASONAL_ALPHA", "0.05"))
+DETECTOR_SEASONAL_MIN_SAMPLES = int(os.environ.get("DETECTOR_SEASONAL_MIN_SAMPLES", "240"))
+DETECTOR_STALE_SECONDS = float(os.environ.get("DETECTOR_STALE_SECONDS", "3600"))
+
+class StreamingDetector:
+    """Incremental per-series anomaly detector
+
+    Every series (a metric family plus its label set) owns one row in a set of
+    NumPy arrays holding its EWMA baseline and variance, a seasonal profile of
+    DETECTOR_SEASON_BUCKETS buckets and its current anomaly streak. A tick
+    updates all series of a family at once, at O(1) cost per series.
+
+    A sample is anomalous when it is above the family's floor and, once the
+    series is warmed up, deviates from the expected value (the seasonal
+    profile when that bucket has enough history, otherwise the EWMA baseline)
+    by at least DETECTOR_Z_THRESHOLD standard deviations. Until then the floor
+    alone decides, which is how the old fixed thresholds behaved.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self._lock = threading.Lock()
+        self._rows: Dict[Tuple[str, Tuple], int] = {}
+        self._keys: List[Optional[Tuple[str, Tuple]]] = [None] * capacity
+        self._free = list(range(capacity - 1, -1, -1))
+        self._last_prune = 0.0
+
+        self.mean = np.zeros(capacity)
+        self.var = np.zeros(capacity)
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self.streak = np.zeros(capacity, dtype=np.int32)
+        self.last_seen = np.zeros(capacity)
+        self.seasonal_mean = np.zeros((capacity, DETECTOR_SEASON_BUCKETS))
+        self.seasonal_count = np.zeros((capacity, DETECTOR_SEASON_BUCKETS), dtype=np.int32)
+
+    def _grow(self):
+        """Double the capacity of every state array"""
+        capacity = len(self._keys)
+        self._keys.extend([None] * capacity)
+        self._free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+        self.mean = np.concatenate([self.mean, np.zeros(capacity)])
+        self.var = np.concatenate([self.var, np.zeros(capacity)])
+        self.count = np.concatenate([self.count, np.zeros(capacity, dtype=np.int64)])
+        self.streak = np.concatenate([self.streak, np.zeros(capacity, dtype=np.int32)])
+        self.last_seen = np.concatenate([self.last_seen, np.zeros(capacity)])
+        self.seasonal_mean = np.concatenate([self.seasonal_mean, np.zeros((capacity, DETECTOR_SEASON_BUCKETS))])
+        self.seasonal_count = np.concatenate([self.seasonal_count, np.zeros((capacity, DETECTOR_SEASON_BUCKETS), dtype=np.int32)])
+
+    def _row(self, key: Tuple[str, Tuple]) -> int:
+        """Get the row of a series, allocating a fresh one for new series"""
+        row = self._rows.get(key)
+        if row is None:
+            if not self._free:
+                self._grow()
+            row = self._free.pop()
+            self._rows[key] = row
+            self._keys[row] = key
+        return row
+
+    def _prune(self, now: float):
+        """Release the rows of series that have not been seen for DETECTOR_STALE_SECONDS"""
+        if now - self._last_prune < DETECTOR_STALE_SECONDS / 10:
+            return
+        self._last_prune = now
+
+        stale = np.flatnonzero((self.count > 0) & (self.last_seen < now - DETECTOR_STALE_SECONDS))
+        for row in stale.tolist():
+            del self._rows[self._keys[row]]
+            self._keys[row] = None
+            self._free.append(row)
+
+        self.mean[stale] = 0.0
+        self.var[stale] = 0.0
+        self.count[stale] = 0
+        self.streak[stale] = 0
+        self.last_seen[stale] = 0.0
+        self.seasonal_mean[stale] = 0.0
+        self.seasonal_count[stale] = 0
+
+        if len(stale):
+            seer_logger.info(f"Seer detector released {len(stale)} stale series")
+
+    def update(self, family: str, labels: List[Dict[str, str]], values: np.ndarray,
+               floor: float, now: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Feed one tick of samples for a metric family
+
+        Returns arrays aligned with `values`: "anomalous", "streak" (consecutive
+        anomalous ticks including this one), "expected" and "zscore".
+        """
+        now = time.time() if now is None else now
+        values = np.asarray(values, dtype=np.float64)
+
+        with self._lock:
+            self._prune(now)
+            rows = np.fromiter(
+                (self._row((family, tuple(sorted(series_labels.items())))) for series_labels in labels),
+                dtype=np.int64,
+                count=len(labels)
+            )
+            bucket = int(now % DETECTOR_SEASON_SECONDS / DETECTOR_SEASON_SECONDS * DETECTOR_SEASON_BUCKETS) % DETECTOR_SEASON_BUCKETS
+
+            mean = self.mean[rows]
+            var = self.var[rows]
+            count = self.count[rows]
+            seasonal_mean = self.seasonal_mean[rows, bucket]
+            seasonal_count = self.seasonal_count[rows, bucket]
+
+            # Score against the seasonal profile when it has enough history, else the EWMA baseline
+            expected = np.where(seasonal_count >= DETECTOR_SEASONAL_MIN_SAMPLES, seasonal_mean, mean)
+            std = np.maximum(np.sqrt(var), np.maximum(np.abs(expected) * DETECTOR_MIN_RELATIVE_STD, 1e-9))
+            zscore = np.where(count > 0, (values - expected) / std, 0.0)
+
+            deviating = np.where(count >= DETECTOR_WARMUP_SAMPLES, zscore >= DETECTOR_Z_THRESHOLD, True)
+            anomalous = (values > floor) & deviating
+            streak = np.where(anomalous, self.streak[rows] + 1, 0)
+
+            # Update the baseline, letting anomalies pull it along only slowly
+            alpha = np.where(anomalous, DETECTOR_ALPHA * DETECTOR_ANOMALY_ALPHA_FACTOR, DETECTOR_ALPHA)
+            diff = values - mean
+            first = count == 0
+            self.mean[rows] = np.where(first, values, mean + alpha * diff)
+            self.var[rows] = np.where(first, 0.0, (1 - alpha) * (var + alpha * diff * diff))
+            self.seasonal_mean[rows, bucket] = np.where(
+                seasonal_count == 0, values, seasonal_mean + DETECTOR_SEASONAL_ALPHA * (values - seasonal_mean)
+            )
+            self.seasonal_count[rows, bucket] = seasonal_count + 1
+            self.count[rows] = count + 1
+            self.streak[rows] = streak
+            self.last_seen[rows] = now
+
+        return {
+            "anomalous": anomalous,
+            "streak": streak,
+            "expected": expected,
+            "zscore": zscore
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Get detector statistics"""
+        with self._lock:
+            active = self.count > 0
+            return {
+                "series": len(self._rows),
+                "capacity": len(self._keys),
+                "anomalous": int(np.count_nonzero(self.streak[active])),
+                "sustained": int(np.count_nonzero(self.streak[active] >= DETECTOR_SUSTAIN_TICKS)),
+                "sustain_ticks": DETECTOR_SUSTAIN_TICKS,
+                "z_threshold": DETECTOR_Z_THRESHOLD
+            }
+
+# Global detector shared by every Seer tick
+detector = StreamingDetector()
@@ -1,4 +1,4 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import asdict
 
 import sys
@@ -13,7 +13,8 @@ def get_incidents(
     pod_name: Optional[str] = None,
     namespace: Optional[str] = None,
     since: Optional[int] = None,
-    limit: Optional[int] = None
+    limit: Optional[int] = None,
+    before: Optional[Tuple[int, str]] = None
 ) -> List[Dict[str, Any]]:
     """Forge Agent: Get incidents with optional filtering"""
     forge_logger.info(f"Forge is retrieving incidents with filters: resolved={resolved}, type={incident_type}, pod={pod_name}, namespace={namespace}, limit={limit}")
@@ -24,7 +25,8 @@ def get_incidents(
         pod_name=pod_name,
         namespace=namespace,
         since=since,
-        limit=limit
+        limit=limit,
+        before=before
     )
     
     forge_logger.info(f"Forge found {len(incidents)} incidents matching criteria")
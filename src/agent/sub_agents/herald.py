@@ -1,10 +1,9 @@
-import json
 from typing import Dict, List, Any, Optional
 
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from sub_agents.logger import herald_logger
+from sub_agents.logger import herald_logger, log_json
 
 def format_response(state: Dict[str, Any]) -> Dict[str, Any]:
     """Herald Agent: Format the response for the API"""
@@ -29,9 +28,22 @@ def format_response(state: Dict[str, Any]) -> Dict[str, Any]:
                 "namespace": action.get("namespace"),
                 "issue_type": action.get("issue_type"),
                 "restart_count": action.get("restart_count"),
-                "github_issue_number": action.get("github_issue", {}).get("number"),
-                "github_issue_url": action.get("github_issue", {}).get("html_url"),
-                "incident_id": action.get("incident_id")
+                "github_issue_number": (action.get("github_issue") or {}).get("number"),
+                "github_issue_url": (action.get("github_issue") or {}).get("html_url"),
+                "incident_id": action.get("incident_id"),
+                "results": [
+                    {
+                        "status": result.get("status"),
+                        "pod_name": result.get("pod_name"),
+                        "namespace": result.get("namespace"),
+                        "issue_type": result.get("issue_type"),
+                        "restart_count": result.get("restart_count"),
+                        "github_issue_number": (result.get("github_issue") or {}).get("number"),
+                        "incident_id": result.get("incident_id"),
+                        "error": result.get("error")
+                    }
+                    for result in action.get("results", [])
+                ]
             }
         elif action_type == "analyze_code":
             herald_logger.info("Herald is formatting analyze_code response")
@@ -55,7 +67,7 @@ def format_response(state: Dict[str, Any]) -> Dict[str, Any]:
                 "message": "No issues detected"
             }
     
-    herald_logger.info(f"Herald completed final response: {json.dumps(response)}")
+    log_json(herald_logger, "Herald completed final response: %s", response)
     
     return {
         **state,
@@ -1,5 +1,11 @@
-import logging
+import os
 import sys
+import json
+import time
+import random
+import logging
+import threading
+from typing import Dict, Any
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, 
@@ -19,3 +25,120 @@ smith_logger = logging.getLogger("agent.smith")
 vision_logger = logging.getLogger("agent.vision")
 herald_logger = logging.getLogger("agent.herald")
 oracle_logger = logging.getLogger("agent.oracle")
+
+
+def _parse_component_settings(value: str) -> Dict[str, str]:
+    """Parse a "component=value,component=value" setting."""
+    settings = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        name, setting = item.split("=", 1)
+        if name.strip() and setting.strip():
+            settings[name.strip()] = setting.strip()
+    return settings
+
+
+# Per-component log levels, e.g. AGENT_LOG_LEVELS="agent.seer=WARNING,agent.smith=DEBUG"
+LOG_LEVELS = _parse_component_settings(os.environ.get("AGENT_LOG_LEVELS", ""))
+
+# Per-component payload sample rates (0.0 - 1.0), e.g. AGENT_LOG_SAMPLE="agent.seer=0.1"
+LOG_SAMPLE_RATES = {}
+for _name, _rate in _parse_component_settings(os.environ.get("AGENT_LOG_SAMPLE", "")).items():
+    try:
+        LOG_SAMPLE_RATES[_name] = min(max(float(_rate), 0.0), 1.0)
+    except ValueError:
+        logger.warning(f"Ignoring invalid AGENT_LOG_SAMPLE rate for {_name}: {_rate}")
+
+for _name, _level in LOG_LEVELS.items():
+    try:
+        logging.getLogger(_name).setLevel(_level.upper())
+    except ValueError:
+        logger.warning(f"Ignoring invalid AGENT_LOG_LEVELS level for {_name}: {_level}")
+
+
+class PayloadStats:
+    """Counts rendered and skipped log payloads and the time spent rendering them."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rendered = 0
+        self.render_seconds = 0.0
+        self.skipped_level = 0
+        self.skipped_sampled = 0
+
+    def record_render(self, seconds: float):
+        with self._lock:
+            self.rendered += 1
+            self.render_seconds += seconds
+
+    def record_skip(self, sampled: bool):
+        with self._lock:
+            if sampled:
+                self.skipped_sampled += 1
+            else:
+                self.skipped_level += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            skipped = self.skipped_level + self.skipped_sampled
+            avg_render = self.render_seconds / self.rendered if self.rendered else 0.0
+            return {
+                "rendered": self.rendered,
+                "render_seconds": self.render_seconds,
+                "avg_render_seconds": avg_render,
+                "skipped_level": self.skipped_level,
+                "skipped_sampled": self.skipped_sampled,
+                # Skipped payloads were never serialized, so estimate what they would have cost
+                "estimated_saved_seconds": skipped * avg_render,
+                "levels": dict(LOG_LEVELS),
+                "sample_rates": dict(LOG_SAMPLE_RATES)
+            }
+
+
+payload_stats = PayloadStats()
+
+
+class LazyJSON:
+    """Log argument that only serializes its payload when a handler formats the record."""
+
+    __slots__ = ("payload", "_rendered")
+
+    def __init__(self, payload: Any):
+        self.payload = payload
+        self._rendered = None
+
+    def __str__(self) -> str:
+        # Several handlers may format the same record, so render once
+        if self._rendered is None:
+            start = time.perf_counter()
+            try:
+                self._rendered = json.dumps(self.payload, default=str)
+            finally:
+                payload_stats.record_render(time.perf_counter() - start)
+        return self._rendered
+
+
+def log_json(log: logging.Logger, msg: str, payload: Any, *args, level: int = logging.INFO):
+    """Log msg with payload rendered as JSON into its first %s, only if the record is emitted."""
+    if not log.isEnabledFor(level):
+        payload_stats.record_skip(sampled=False)
+        return
+
+    # Sample rates are inherited from the nearest configured parent component
+    name = log.name
+    while name and name not in LOG_SAMPLE_RATES:
+        name = name.rpartition(".")[0]
+    rate = LOG_SAMPLE_RATES.get(name)
+    if rate is not None and random.random() >= rate:
+        # Keep the event in the log, just not its payload
+        payload_stats.record_skip(sampled=True)
+        log.log(level, msg, "<payload omitted>", *args)
+        return
+
+    log.log(level, msg, LazyJSON(payload), *args)
+
+
+def get_payload_stats() -> Dict[str, Any]:
+    """Get structured logging payload statistics."""
+    return payload_stats.to_dict()
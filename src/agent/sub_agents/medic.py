@@ -1,37 +1,48 @@
 import os
-import json
 import time
 import uuid
 import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional
 from dataclasses import asdict
 
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from mcp_client import mcp_manager
-from incident_store import incident_store, Incident
-from sub_agents.logger import medic_logger, forge_logger, vision_logger, herald_logger
+from incident_store import incident_store, Incident, issue_index, issue_fingerprint, add_incident_note, FINGERPRINT_MARKER
+from outbox import outbox
+from sub_agents.vision import queue_dashboard_annotation
+from sub_agents.logger import medic_logger, forge_logger, herald_logger, log_json
 
-def remediate_issue(state: Dict[str, Any]) -> Dict[str, Any]:
-    """Medic Agent: Remediate the issue by restarting the pod and creating a GitHub issue"""
-    if state.get("error"):
-        medic_logger.warning(f"Medic is skipping remediation due to error: {state.get('error')}")
-        return state
-    
-    medic_logger.info("Medic is starting remediation")
-    
-    analysis = state.get("analysis", {})
-    issues = analysis.get("issues", [])
-    
-    if not issues:
-        medic_logger.warning("Medic found no issues to remediate")
-        return state
-    
-    # Sort issues by severity
-    issues.sort(key=lambda x: {"high": 3, "medium": 2, "low": 1}.get(x["severity"], 0), reverse=True)
-    
-    # Get the most severe issue
-    issue = issues[0]
+from sub_agents.oracle import ANALYSIS_THRESHOLD
+
+# Seconds to wait for a pod restart operation to complete; covers the Kubernetes MCP's
+# RESTART_DOWN_TIMEOUT + RESTART_READY_TIMEOUT (5 + 30 s) and its shutdown requests
+MEDIC_RESTART_TIMEOUT = float(os.environ.get("MEDIC_RESTART_TIMEOUT", "45"))
+# Follow-up waits on a restart that is still pending or running when the first wait ends
+MEDIC_RESTART_FOLLOW_UPS = int(os.environ.get("MEDIC_RESTART_FOLLOW_UPS", "2"))
+
+# Remediation concurrency: pods restarted at once overall and per namespace
+MEDIC_MAX_WORKERS = int(os.environ.get("MEDIC_MAX_WORKERS", "4"))
+MEDIC_MAX_PER_NAMESPACE = int(os.environ.get("MEDIC_MAX_PER_NAMESPACE", "2"))
+
+_remediation_pool = ThreadPoolExecutor(max_workers=MEDIC_MAX_WORKERS, thread_name_prefix="medic")
+_namespace_limits: Dict[str, threading.BoundedSemaphore] = {}
+_namespace_limits_lock = threading.Lock()
+
+# Pages of open issues read when rebuilding the issue index
+ISSUE_INDEX_REBUILD_MAX_PAGES = int(os.environ.get("ISSUE_INDEX_REBUILD_MAX_PAGES", "10"))
+# Seconds between attempts to rebuild the issue index after a failure
+ISSUE_INDEX_REBUILD_RETRY = float(os.environ.get("ISSUE_INDEX_REBUILD_RETRY", "300"))
+_issue_index_rebuild_lock = threading.Lock()
+
+# Times a GitHub issue the outbox gave up on is queued again before its incidents are left without one
+MEDIC_ISSUE_CREATE_RETRIES = int(os.environ.get("MEDIC_ISSUE_CREATE_RETRIES", "3"))
+_last_issue_index_rebuild = 0.0
+
+def remediate_pod(issue: Dict[str, Any], analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Medic Agent: Restart the pod of one issue, record the incident and queue its GitHub update and Grafana annotation"""
     pod_name = issue["pod_name"]
     namespace = issue["namespace"]
     issue_type = issue["type"]
@@ -39,17 +50,48 @@ def remediate_issue(state: Dict[str, Any]) -> Dict[str, Any]:
     threshold = issue["threshold"]
     severity = issue["severity"]
     
-    medic_logger.info(f"Medic is addressing issue: {json.dumps(issue)}")
+    log_json(medic_logger, "Medic is addressing issue: %s", issue)
     
-    try:
-        # Restart the pod
-        medic_logger.info(f"Medic is restarting pod {pod_name} in namespace {namespace}")
-        medic_logger.info(f"MEDIC ATTEMPTING TO RESTART POD: {pod_name} in namespace {namespace} due to {issue_type} issue")
-        restart_result = mcp_manager.use_tool("kubernetes", "restart_pod", {
-            "namespace": namespace,
-            "pod_name": pod_name
+    # Restart the pod
+    medic_logger.info(f"Medic is restarting pod {pod_name} in namespace {namespace}")
+    medic_logger.info(f"MEDIC ATTEMPTING TO RESTART POD: {pod_name} in namespace {namespace} due to {issue_type} issue")
+    # Restarts are asynchronous operations on the Kubernetes MCP server; wait for this one to finish
+    restart_result = mcp_manager.use_tool("kubernetes", "restart_pod", {
+        "namespace": namespace,
+        "pod_name": pod_name,
+        "wait": True,
+        "timeout": MEDIC_RESTART_TIMEOUT
+    })
+    log_json(medic_logger, "Medic received restart result: %s", restart_result)
+    operation_id = restart_result.get("operation_id")
+    
+    # A slow restart is still in progress, not failed; keep waiting on its operation
+    follow_ups = 0
+    while restart_result.get("status") in ("pending", "running") and follow_ups < MEDIC_RESTART_FOLLOW_UPS:
+        follow_ups += 1
+        medic_logger.info(f"Medic is still waiting for restart operation {operation_id} of {pod_name} ({restart_result.get('status')}: {restart_result.get('message')})")
+        operation = mcp_manager.use_tool("kubernetes", "get_operation", {
+            "operation_id": operation_id,
+            "wait": True,
+            "timeout": MEDIC_RESTART_TIMEOUT
         })
-        medic_logger.info(f"Medic received restart result: {json.dumps(restart_result)}")
+        if operation.get("error"):
+            medic_logger.warning(f"Medic could not get restart operation {operation_id}: {operation['error']}")
+            break
+        restart_result = {**restart_result, **operation}
+    
+    # A restart that failed, never finished or never reached the server is not a restart
+    restart_failed = bool(restart_result.get("error")) or restart_result.get("status") not in (None, "succeeded")
+    restart_error = None
+    if restart_failed:
+        if restart_result.get("status") in ("pending", "running"):
+            restart_error = f"Restart still {restart_result['status']} after {MEDIC_RESTART_TIMEOUT * (follow_ups + 1):.0f} seconds: {restart_result.get('message')}"
+        else:
+            restart_error = restart_result.get("message") or restart_result.get("error") or f"Restart ended as {restart_result.get('status')}"
+        medic_logger.warning(f"Medic restart operation {operation_id} for {pod_name} ended as {restart_result.get('status')}: {restart_error}")
+        herald_logger.info(f"Herald: Medic failed to restart pod {pod_name} in namespace {namespace}: {restart_error}")
+        restart_count = incident_store.get_restart_count(pod_name, namespace)
+    else:
         medic_logger.info(f"MEDIC POD RESTART COMPLETED: {pod_name} in namespace {namespace}")
         herald_logger.info(f"Herald: Medic has successfully restarted pod {pod_name} in namespace {namespace}")
         
@@ -57,11 +99,15 @@ def remediate_issue(state: Dict[str, Any]) -> Dict[str, Any]:
         medic_logger.info(f"Medic is incrementing restart count for {pod_name}")
         restart_count = incident_store.increment_restart_count(pod_name, namespace)
         medic_logger.info(f"Medic updated restart count to: {restart_count}")
-        
-        # Create GitHub issue
-        forge_logger.info(f"Forge is creating incident ticket for {issue_type.upper()} issue in pod {pod_name}")
-        issue_title = f"{issue_type.upper()} usage alert for pod {pod_name}"
-        issue_body = f"""
+    
+    # Create GitHub issue
+    forge_logger.info(f"Forge is creating incident ticket for {issue_type.upper()} issue in pod {pod_name}")
+    issue_title = f"{issue_type.upper()} usage alert for pod {pod_name}"
+    if restart_failed:
+        action_text = f"An automatic restart was attempted but failed (operation {operation_id}): {restart_error}. The pod has not been restarted."
+    else:
+        action_text = "The pod has been automatically restarted to mitigate the issue."
+    issue_body = f"""
 # {issue_type.upper()} Usage Alert
 
 ## Pod Information
@@ -75,7 +121,7 @@ def remediate_issue(state: Dict[str, Any]) -> Dict[str, Any]:
 - **Timestamp**: {datetime.datetime.fromtimestamp(analysis.get("timestamp", time.time())).strftime('%Y-%m-%d %H:%M:%S')}
 
 ## Action Taken
-The pod has been automatically restarted to mitigate the issue.
+{action_text}
 
 ## Restart Count
 This pod has been restarted {restart_count} times today.
@@ -85,72 +131,280 @@ If this issue persists, consider:
 1. Investigating the application logs
 2. Checking for memory leaks or inefficient code
 3. Adjusting resource limits
-        """
-        
-        forge_logger.info(f"Forge is creating GitHub issue: {issue_title}")
-        github_issue = mcp_manager.use_tool("github", "create_issue", {
+    """
+    
+    # Repeat incidents of the same pod, type and day go to the issue already tracking them
+    ensure_issue_index()
+    incident_id = str(uuid.uuid4())
+    fingerprint = issue_fingerprint(namespace, pod_name, issue_type)
+    comment = (
+        f"Pod {pod_name} {'could not be restarted' if restart_failed else 'was restarted again'} at {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} "
+        f"due to high {issue_type} usage ({value:.2f}%, threshold {threshold}%). "
+        f"Restart count today: {restart_count}. Incident: {incident_id}"
+        + (f"\n\nRestart operation {operation_id} failed: {restart_error}" if restart_failed else "")
+    )
+    decision, github_issue = issue_index.track(fingerprint, incident_id, comment)
+    
+    # Create incident record; a new GitHub issue is attached once the outbox has delivered it
+    forge_logger.info(f"Forge is creating incident record with ID {incident_id}")
+    incident = Incident(
+        id=incident_id,
+        type=issue_type,
+        pod_name=pod_name,
+        namespace=namespace,
+        timestamp=int(time.time()),
+        severity=severity,
+        metrics={
+            "value": value,
+            "threshold": threshold
+        },
+        action_taken="restart_failed" if restart_failed else "restart_pod",
+        github_issue=github_issue,
+        notes=f"Restart operation {operation_id} failed: {restart_error}" if restart_failed else None
+    )
+    
+    incident_store.add_incident(incident)
+    forge_logger.info(f"Forge created incident record {incident_id}")
+    
+    # Queue the GitHub update and Grafana annotation so API latency stays off the remediation path
+    if decision == "create":
+        forge_logger.info(f"Forge is queueing GitHub issue: {issue_title}")
+        github_key = f"github_issue:{incident_id}"
+        outbox.enqueue(github_key, "github", "create_issue", {
             "title": issue_title,
-            "body": issue_body,
+            "body": issue_body + "\n" + FINGERPRINT_MARKER.format(fingerprint),
             "labels": [issue_type, "auto-remediated", severity]
+        }, handler="incident_github_issue", context={"incident_id": incident_id, "fingerprint": fingerprint})
+    elif decision == "comment":
+        forge_logger.info(f"Forge is queueing a comment on existing issue #{github_issue['number']} for {fingerprint}")
+        github_key = f"github_comment:{incident_id}"
+        outbox.enqueue(github_key, "github", "add_issue_comment", {
+            "issue_number": github_issue["number"],
+            "body": comment
         })
-        forge_logger.info(f"Forge created GitHub issue #{github_issue.get('number')}: {github_issue.get('html_url')}")
-        herald_logger.info(f"Herald: Forge has created issue #{github_issue.get('number')} for {issue_type} alert in {pod_name}")
-        
-        # Create incident record
-        incident_id = str(uuid.uuid4())
-        forge_logger.info(f"Forge is creating incident record with ID {incident_id}")
-        incident = Incident(
-            id=incident_id,
-            type=issue_type,
-            pod_name=pod_name,
-            namespace=namespace,
-            timestamp=int(time.time()),
-            severity=severity,
-            metrics={
-                "value": value,
-                "threshold": threshold
-            },
-            action_taken="restart_pod",
-            github_issue=github_issue
-        )
-        
-        incident_store.add_incident(incident)
-        forge_logger.info(f"Forge created incident record {incident_id}")
-        
-        # Create Grafana annotation
-        dashboard_id = 1  # Assuming dashboard ID 1 for the test application dashboard
-        vision_logger.info(f"Vision is updating dashboard {dashboard_id} with alert for {pod_name}")
-        annotation_result = mcp_manager.use_tool("grafana", "create_annotation", {
-            "dashboard_id": dashboard_id,
-            "time": int(time.time() * 1000),  # Convert to milliseconds
-            "text": f"Pod {pod_name} restarted due to high {issue_type} usage ({value:.2f}%)",
-            "tags": [issue_type, "auto-remediated", severity]
+    else:
+        forge_logger.info(f"Forge is holding the comment for {fingerprint} until its issue has been created")
+        github_key = None
+    
+    dashboard_id = 1  # Assuming dashboard ID 1 for the test application dashboard
+    annotation_key = f"annotation:{incident_id}"
+    queue_dashboard_annotation(
+        annotation_key,
+        dashboard_id,
+        f"Pod {pod_name} {'restart failed' if restart_failed else 'restarted'} due to high {issue_type} usage ({value:.2f}%)",
+        [issue_type, "auto-remediated", severity]
+    )
+    
+    result = {
+        "status": "error" if restart_failed else "success",
+        "pod_name": pod_name,
+        "namespace": namespace,
+        "issue_type": issue_type,
+        "restart_result": restart_result,
+        "operation_id": operation_id,
+        "restart_count": restart_count,
+        "github_issue": github_issue,
+        "github_action": decision,
+        "incident_id": incident_id,
+        "outbox_key": github_key,
+        "annotation_key": annotation_key
+    }
+    
+    if restart_failed:
+        result["error"] = restart_error
+        medic_logger.error(f"Medic could not remediate {pod_name}: {restart_error}")
+        herald_logger.info(f"Herald: Incident {incident_id} recorded - Pod {pod_name} restart failed, GitHub {'issue' if decision == 'create' else 'comment'} and annotation queued")
+        return result
+    
+    medic_logger.info(f"Medic completed remediation of {pod_name} successfully")
+    herald_logger.info(f"Herald: Incident {incident_id} remediated - Pod {pod_name} restarted, GitHub {'issue' if decision == 'create' else 'comment'} and annotation queued")
+    
+    return result
+
+def attach_github_issue(github_issue: Dict[str, Any], context: Dict[str, Any]):
+    """Outbox handler: store a delivered GitHub issue on its incidents and post the repeats held for it"""
+    incident_store.update_incident(context["incident_id"], github_issue=github_issue)
+    for incident_id in context.get("incident_ids", []):
+        incident_store.update_incident(incident_id, github_issue=github_issue)
+    forge_logger.info(f"Forge created GitHub issue #{github_issue.get('number')} for incident {context['incident_id']}: {github_issue.get('html_url')}")
+    herald_logger.info(f"Herald: Forge has created issue #{github_issue.get('number')} for incident {context['incident_id']}")
+    
+    if not context.get("fingerprint"):
+        return
+    
+    incident_ids, comments = issue_index.resolve(context["fingerprint"], github_issue)
+    for incident_id in incident_ids:
+        incident_store.update_incident(incident_id, github_issue=github_issue)
+    if comments:
+        # Repeats that happened while the issue was being created go out as one comment
+        forge_logger.info(f"Forge is queueing {len(comments)} held repeat incidents as one comment on issue #{github_issue.get('number')}")
+        outbox.enqueue(f"github_comment:{context['incident_id']}", "github", "add_issue_comment", {
+            "issue_number": github_issue["number"],
+            "body": "\n\n".join(comments)
         })
-        vision_logger.info(f"Vision created dashboard annotation: {json.dumps(annotation_result)}")
-        herald_logger.info(f"Herald: Vision has updated the monitoring dashboard with {issue_type} alert for {pod_name}")
-        
-        action = {
-            "type": "remediate",
-            "pod_name": pod_name,
-            "namespace": namespace,
-            "issue_type": issue_type,
-            "restart_result": restart_result,
-            "restart_count": restart_count,
-            "github_issue": github_issue,
-            "incident_id": incident_id,
-            "annotation": annotation_result
-        }
-        
-        medic_logger.info(f"Medic completed remediation successfully")
-        herald_logger.info(f"Herald: Incident {incident_id} remediated - Pod {pod_name} restarted and issue #{github_issue.get('number')} created")
+
+def retry_github_issue(failure: Dict[str, Any], context: Dict[str, Any]):
+    """Outbox failure handler: queue a GitHub issue the outbox gave up on again, with the repeats held for it
+    
+    After MEDIC_ISSUE_CREATE_RETRIES retries the fingerprint is released so the
+    next incident opens a new issue, and the incidents are noted as unreported.
+    """
+    incident_ids = [context["incident_id"], *context.get("incident_ids", [])]
+    fingerprint = context.get("fingerprint")
+    retries = context.get("retries", 0)
+    
+    if not fingerprint or retries >= MEDIC_ISSUE_CREATE_RETRIES:
+        held_incidents, _ = issue_index.release(fingerprint) if fingerprint else ([], [])
+        forge_logger.error(f"Forge could not create GitHub issue {failure['key']} for {len(incident_ids) + len(held_incidents)} incidents: {failure['error']}")
+        for incident_id in incident_ids + held_incidents:
+            add_incident_note(incident_id, f"GitHub issue was not created after {retries + 1} tries: {failure['error']}")
+        return
+    
+    # Repeats held while the issue was being created go into the body of the retried issue
+    held_incidents, held_comments = issue_index.restart(fingerprint)
+    marker = FINGERPRINT_MARKER.format(fingerprint)
+    body = failure["arguments"]["body"].replace(marker, "").rstrip()
+    if held_comments:
+        body += "\n\n## Repeat Incidents\n" + "\n\n".join(held_comments)
+    
+    forge_logger.warning(f"Forge is queueing GitHub issue {failure['key']} again with {len(held_comments)} held repeats: {failure['error']}")
+    outbox.enqueue(f"{failure['key']}:retry{retries + 1}", "github", "create_issue", {
+        **failure["arguments"],
+        "body": body + "\n" + marker
+    }, handler="incident_github_issue", context={
+        "incident_id": context["incident_id"],
+        "incident_ids": incident_ids[1:] + held_incidents,
+        "fingerprint": fingerprint,
+        "retries": retries + 1
+    })
+
+def ensure_issue_index():
+    """Start a background rebuild of the issue index when its file was missing, at most once per retry interval"""
+    global _last_issue_index_rebuild
+    if not issue_index.needs_rebuild:
+        return
+    
+    # Remediation never waits for the rebuild; track() works with the entries it already has
+    if not _issue_index_rebuild_lock.acquire(blocking=False):
+        return
+    if not issue_index.needs_rebuild or time.time() - _last_issue_index_rebuild < ISSUE_INDEX_REBUILD_RETRY:
+        _issue_index_rebuild_lock.release()
+        return
+    _last_issue_index_rebuild = time.time()
+    
+    threading.Thread(target=rebuild_issue_index, name="issue-index-rebuild", daemon=True).start()
+
+def rebuild_issue_index():
+    """Rebuild the issue index from open auto-remediated GitHub issues, releasing the rebuild lock when done"""
+    try:
+        since = (datetime.datetime.utcnow() - datetime.timedelta(days=issue_index.retention_days)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        issues = []
+        page = 1
+        while page and page <= ISSUE_INDEX_REBUILD_MAX_PAGES:
+            result = mcp_manager.use_tool("github", "list_issues", {
+                "state": "open",
+                "labels": ["auto-remediated"],
+                "since": since,
+                "per_page": 100,
+                "page": page
+            })
+            if result.get("error"):
+                # Keep going without the index; the rebuild is retried after ISSUE_INDEX_REBUILD_RETRY seconds
+                forge_logger.warning(f"Forge could not rebuild the issue index: {result['error']}")
+                return
+            issues.extend(result.get("issues", []))
+            page = result.get("next_page")
         
-        return {
-            **state,
-            "action": action
-        }
+        issue_index.rebuild(issues)
     except Exception as e:
-        medic_logger.error(f"Error remediating issue: {str(e)}")
+        forge_logger.error(f"Forge failed to rebuild the issue index: {str(e)}")
+    finally:
+        _issue_index_rebuild_lock.release()
+
+outbox.register_handler("incident_github_issue", attach_github_issue, on_failure=retry_github_issue)
+
+def remediate_pod_limited(issue: Dict[str, Any], analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Run remediate_pod within the namespace concurrency limit, capturing errors as a result"""
+    namespace = issue["namespace"]
+    with _namespace_limits_lock:
+        limit = _namespace_limits.setdefault(namespace, threading.BoundedSemaphore(MEDIC_MAX_PER_NAMESPACE))
+    
+    with limit:
+        try:
+            return remediate_pod(issue, analysis)
+        except Exception as e:
+            medic_logger.error(f"Error remediating issue for pod {issue['pod_name']}: {str(e)}", exc_info=True)
+            return {
+                "status": "error",
+                "pod_name": issue["pod_name"],
+                "namespace": namespace,
+                "issue_type": issue["type"],
+                "error": str(e)
+            }
+
+def select_actionable_issues(issues: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Pick the issues to remediate this tick, one per pod, most severe first
+    
+    The first issue is the one the Oracle decided to remediate. Other pods are
+    only included while they are below the code analysis threshold; pods past
+    it are left for the Oracle to escalate to Smith.
+    """
+    ordered = sorted(issues, key=lambda x: {"high": 3, "medium": 2, "low": 1}.get(x["severity"], 0), reverse=True)
+    
+    selected = {}
+    for issue in ordered:
+        pod_key = (issue["namespace"], issue["pod_name"])
+        if pod_key in selected:
+            # Same pod breached on several metrics; one restart covers them all
+            selected[pod_key].setdefault("merged_types", []).append(issue["type"])
+            continue
+        if selected and incident_store.get_restart_count(issue["pod_name"], issue["namespace"]) >= ANALYSIS_THRESHOLD:
+            medic_logger.info(f"Medic is leaving {issue['pod_name']} for code analysis")
+            continue
+        selected[pod_key] = dict(issue)
+    
+    return list(selected.values())
+
+def remediate_issue(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Medic Agent: Remediate every actionable issue by restarting pods and creating GitHub issues"""
+    if state.get("error"):
+        medic_logger.warning(f"Medic is skipping remediation due to error: {state.get('error')}")
+        return state
+    
+    medic_logger.info("Medic is starting remediation")
+    
+    analysis = state.get("analysis", {})
+    issues = analysis.get("issues", [])
+    
+    if not issues:
+        medic_logger.warning("Medic found no issues to remediate")
+        return state
+    
+    actionable = select_actionable_issues(issues)
+    medic_logger.info(f"Medic is remediating {len(actionable)} of {len(issues)} issues with up to {MEDIC_MAX_WORKERS} workers")
+    
+    # Remediate all pods concurrently; results keep the severity order
+    futures = [_remediation_pool.submit(remediate_pod_limited, issue, analysis) for issue in actionable]
+    results = [future.result() for future in futures]
+    
+    succeeded = [result for result in results if result["status"] == "success"]
+    if not succeeded:
         return {
             **state,
-            "error": f"Error remediating issue: {str(e)}"
+            "error": f"Error remediating issue: {results[0].get('error')}"
         }
+    
+    # The top-level fields describe the most severe remediated issue, as before
+    action = {
+        **succeeded[0],
+        "type": "remediate",
+        "results": results
+    }
+    action.pop("status", None)
+    
+    medic_logger.info(f"Medic remediated {len(succeeded)}/{len(results)} pods")
+    
+    return {
+        **state,
+        "action": action
+    }
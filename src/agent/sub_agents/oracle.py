@@ -4,7 +4,11 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from incident_store import incident_store
-from sub_agents.logger import oracle_logger, herald_logger
+from sub_agents.logger import oracle_logger, herald_logger, log_json
+
+# Thresholds for escalating from restarts to code analysis
+MAX_RESTARTS_PER_DAY = int(os.environ.get("MAX_RESTARTS_PER_DAY", "10"))
+ANALYSIS_THRESHOLD = int(os.environ.get("ANALYSIS_THRESHOLD", "4"))
 
 def decide_action(state: Dict[str, Any]) -> Dict[str, Any]:
     """Oracle Agent: Decide what action to take based on analysis"""
@@ -17,10 +21,6 @@ def decide_action(state: Dict[str, Any]) -> Dict[str, Any]:
     analysis = state.get("analysis", {})
     issues = analysis.get("issues", [])
     
-    # Get thresholds from environment or use defaults
-    MAX_RESTARTS_PER_DAY = 10
-    ANALYSIS_THRESHOLD = 4
-    
     oracle_logger.info(f"Oracle evaluating {len(issues)} issues")
     
     if not issues:
@@ -39,7 +39,7 @@ def decide_action(state: Dict[str, Any]) -> Dict[str, Any]:
     pod_name = issue["pod_name"]
     namespace = issue["namespace"]
     
-    oracle_logger.info(f"Oracle identified most severe issue: {issue}")
+    log_json(oracle_logger, "Oracle identified most severe issue: %s", issue)
     
     # Check restart count
     restart_count = incident_store.get_restart_count(pod_name, namespace)
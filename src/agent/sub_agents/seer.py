@@ -1,83 +1,166 @@
-import json
 import time
-from typing import Dict, List, Any, Optional, Union, TypedDict
+import base64
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import Dict, List, Any, Optional, Union, TypedDict, Callable, Tuple
+
+import numpy as np
 
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from mcp_client import mcp_manager
-from sub_agents.logger import seer_logger, herald_logger
+from sub_agents.logger import seer_logger, herald_logger, log_json
+from sub_agents.detector import detector, DETECTOR_SUSTAIN_TICKS
+
+# Per-source deadlines (in seconds) for the concurrent collection stage
+PROMETHEUS_SOURCE_TIMEOUT = float(os.environ.get("SEER_PROMETHEUS_TIMEOUT", "5"))
+API_STATUS_SOURCE_TIMEOUT = float(os.environ.get("SEER_API_STATUS_TIMEOUT", "5"))
+KUBERNETES_SOURCE_TIMEOUT = float(os.environ.get("SEER_KUBERNETES_TIMEOUT", "5"))
+
+# Thresholds. These are floors: a sample below them is never anomalous, and
+# until a series has a baseline they alone decide (see sub_agents.detector).
+CPU_THRESHOLD = float(os.environ.get("CPU_THRESHOLD", "10"))  # CPU usage percentage threshold (lowered to 10% for testing)
+MEMORY_THRESHOLD = float(os.environ.get("MEMORY_THRESHOLD", "600000000"))  # Memory threshold in bytes (500 MB)
+
+# Metric families checked by analyze_metrics. Each family names the key in
+# state["metrics"] that holds its processed samples, the issue type it raises
+# and its threshold floor.
+METRIC_FAMILIES = [
+    {"type": "cpu", "metric": "cpu", "threshold": CPU_THRESHOLD},
+    {"type": "memory", "metric": "memory", "threshold": MEMORY_THRESHOLD}
+]
+
+# Shared pool for metric collection. It is deliberately not scoped to a single
+# tick so that a source which overruns its deadline does not hold up the next one.
+_collector_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("SEER_COLLECTOR_WORKERS", "8")),
+    thread_name_prefix="seer-collector"
+)
+
+# Instant queries collected every tick, by metric name
+PROMETHEUS_QUERIES = {
+    "cpu": "app_cpu_usage_percent",
+    "memory": "app_memory_usage_bytes",
+    "cpu_spike": "app_cpu_spike_total",
+    "memory_spike": "app_memory_spike_total"
+}
+
+def query_prometheus_batch(queries: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+    """Run several instant queries in one round trip at a shared evaluation time
+    
+    Returns the result of every query that succeeded, keyed like `queries`.
+    """
+    names = list(queries)
+    response = mcp_manager.use_tool("prometheus", "query_batch", {
+        "queries": [queries[name] for name in names],
+        "format": "compact"
+    })
+    if "error" in response:
+        raise RuntimeError(response["error"])
+    
+    results = {}
+    for name, item in zip(names, response.get("results", [])):
+        if item.get("error"):
+            seer_logger.error(f"Seer query '{queries[name]}' failed: {item['error']}")
+            continue
+        results[name] = item
+    return results
+
+def query_api_status() -> Optional[Dict[str, Any]]:
+    """Query the API status endpoint and convert its memory reading into a Prometheus-style result"""
+    import requests
+    status_response = requests.get("http://api:8000/status", timeout=API_STATUS_SOURCE_TIMEOUT)
+    status_response.raise_for_status()
+    status_data = status_response.json()
+    
+    api_memory_value = status_data.get("memory_usage", 0)
+    memory_spike_active = status_data.get("memory_spike_active", False)
+    
+    seer_logger.info(f"Seer received API status endpoint memory: {api_memory_value} bytes, memory_spike_active: {memory_spike_active}")
+    
+    if api_memory_value <= 0:
+        return None
+    
+    # Use the same instance name "test-app:8001" to ensure consistent tracking
+    metric = {"__name__": "app_memory_usage_bytes", "instance": "test-app:8001", "job": "test-app"}
+    return {"result": [{"metric": metric, "value": [int(time.time()), str(api_memory_value)]}]}
+
+def list_pods(namespace: str = "default") -> Dict[str, Any]:
+    """List pods through the Kubernetes MCP server"""
+    return mcp_manager.use_tool("kubernetes", "list_pods", {
+        "namespace": namespace
+    })
+
+def collect_sources(sources: Dict[str, Tuple[Callable[[], Any], float]]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Run all sources concurrently and wait for each one up to its own deadline
+    
+    Returns the results of the sources that completed in time together with a
+    status for every source ("ok", "timeout" or "error"). Sources that miss their
+    deadline or fail are left out of the results so callers can fall back.
+    """
+    started = time.monotonic()
+    futures = {
+        name: (_collector_pool.submit(fn), deadline)
+        for name, (fn, deadline) in sources.items()
+    }
+    
+    results: Dict[str, Any] = {}
+    status: Dict[str, str] = {}
+    
+    # Wait on the shortest deadlines first so that no source waits longer than its own budget
+    for name, (future, deadline) in sorted(futures.items(), key=lambda item: item[1][1]):
+        remaining = max(0.0, started + deadline - time.monotonic())
+        try:
+            results[name] = future.result(timeout=remaining)
+            status[name] = "ok"
+        except FuturesTimeoutError:
+            future.cancel()
+            status[name] = "timeout"
+            seer_logger.warning(f"Seer source '{name}' did not respond within {deadline:.1f} seconds")
+        except Exception as e:
+            status[name] = "error"
+            seer_logger.error(f"Seer source '{name}' failed: {str(e)}")
+    
+    seer_logger.info(f"Seer collected {len(results)}/{len(sources)} sources in {time.monotonic() - started:.2f} seconds")
+    return results, status
 
 def monitor_metrics(state: Dict[str, Any]) -> Dict[str, Any]:
     """Seer Agent: Monitor metrics from Prometheus and API status endpoint"""
     try:
         seer_logger.info("Seer is starting to monitor metrics")
         
-        # Query Prometheus for CPU metrics
-        seer_logger.info("Seer is querying Prometheus for CPU metrics")
-        cpu_result = mcp_manager.use_tool("prometheus", "query", {
-            "query": "app_cpu_usage_percent"
+        # Query every source at once; the tick now costs roughly the slowest single call
+        seer_logger.info("Seer is querying Prometheus (one batch), the API status endpoint and Kubernetes concurrently")
+        results, source_status = collect_sources({
+            "prometheus": (lambda: query_prometheus_batch(PROMETHEUS_QUERIES), PROMETHEUS_SOURCE_TIMEOUT),
+            "api_status": (query_api_status, API_STATUS_SOURCE_TIMEOUT),
+            "pods": (list_pods, KUBERNETES_SOURCE_TIMEOUT)
         })
-        seer_logger.info(f"Seer received CPU metrics: {json.dumps(cpu_result)}")
         
-        # Query Prometheus for memory metrics (we'll override this with the API status endpoint)
-        seer_logger.info("Seer is querying Prometheus for memory metrics")
-        memory_result = mcp_manager.use_tool("prometheus", "query", {
-            "query": "app_memory_usage_bytes"
-        })
-        seer_logger.info(f"Seer received memory metrics from Prometheus: {json.dumps(memory_result)}")
+        # All Prometheus metrics arrive in a single batch response
+        prometheus_results = results.get("prometheus", {})
         
-        # Query API status endpoint for more accurate memory metrics
-        seer_logger.info("Seer is querying API status endpoint for accurate memory metrics")
-        try:
-            import requests
-            status_response = requests.get("http://api:8000/status", timeout=5)
-            status_response.raise_for_status()
-            status_data = status_response.json()
-            
-            # Create a memory metric result that matches the format from Prometheus
-            api_memory_value = status_data.get("memory_usage", 0)
-            memory_spike_active = status_data.get("memory_spike_active", False)
-            
-            seer_logger.info(f"Seer received API status endpoint memory: {api_memory_value} bytes, memory_spike_active: {memory_spike_active}")
-            
-            # Override the memory result with the API status data
-            if api_memory_value > 0:
-                # Create a memory metric that matches the format from Prometheus
-                # Use the same instance name "test-app:8001" to ensure consistent tracking
-                memory_metric = {
-                    "metric": {"__name__": "app_memory_usage_bytes", "instance": "test-app:8001", "job": "test-app"},
-                    "value": api_memory_value,
-                    "timestamp": int(time.time())
-                }
-                
-                # Replace the memory metrics with our custom one
-                memory_result = {"result": [{"metric": memory_metric["metric"], "value": [int(time.time()), str(api_memory_value)]}]}
-                seer_logger.info(f"Seer using memory metrics from API status endpoint: {json.dumps(memory_result)}")
-        except Exception as e:
-            seer_logger.error(f"Seer encountered error querying API status endpoint: {str(e)}")
+        cpu_result = prometheus_results.get("cpu", {})
+        log_json(seer_logger, "Seer received CPU metrics: %s", cpu_result)
+        
+        memory_result = prometheus_results.get("memory", {})
+        log_json(seer_logger, "Seer received memory metrics from Prometheus: %s", memory_result)
+        
+        # Prefer the API status endpoint for more accurate memory metrics
+        if results.get("api_status"):
+            memory_result = results["api_status"]
+            log_json(seer_logger, "Seer using memory metrics from API status endpoint: %s", memory_result)
+        elif source_status.get("api_status") != "ok":
             seer_logger.info("Seer falling back to Prometheus memory metrics")
         
-        # Query Prometheus for CPU spike counter
-        seer_logger.info("Seer is querying Prometheus for CPU spike counter")
-        cpu_spike_result = mcp_manager.use_tool("prometheus", "query", {
-            "query": "app_cpu_spike_total"
-        })
-        seer_logger.info(f"Seer received CPU spike counter: {json.dumps(cpu_spike_result)}")
+        cpu_spike_result = prometheus_results.get("cpu_spike", {})
+        log_json(seer_logger, "Seer received CPU spike counter: %s", cpu_spike_result)
         
-        # Query Prometheus for memory spike counter
-        seer_logger.info("Seer is querying Prometheus for memory spike counter")
-        memory_spike_result = mcp_manager.use_tool("prometheus", "query", {
-            "query": "app_memory_spike_total"
-        })
-        seer_logger.info(f"Seer received memory spike counter: {json.dumps(memory_spike_result)}")
+        memory_spike_result = prometheus_results.get("memory_spike", {})
+        log_json(seer_logger, "Seer received memory spike counter: %s", memory_spike_result)
         
-        # Get Kubernetes pods
-        seer_logger.info("Seer is getting Kubernetes pods")
-        pods_result = mcp_manager.use_tool("kubernetes", "list_pods", {
-            "namespace": "default"
-        })
-        seer_logger.info(f"Seer received pods: {json.dumps(pods_result)}")
+        pods_result = results.get("pods", {})
+        log_json(seer_logger, "Seer received pods: %s", pods_result)
         
         # Process metrics
         metrics = {
@@ -86,10 +169,11 @@ def monitor_metrics(state: Dict[str, Any]) -> Dict[str, Any]:
             "cpu_spike": process_metric_result(cpu_spike_result),
             "memory_spike": process_metric_result(memory_spike_result),
             "pods": pods_result.get("pods", []),
+            "sources": source_status,
             "timestamp": int(time.time())
         }
         
-        seer_logger.info(f"Seer processed metrics: {json.dumps(metrics)}")
+        log_json(seer_logger, "Seer processed metrics: %s", metrics)
         herald_logger.info(f"Herald: Seer has completed monitoring and collected all metrics")
         
         return {
@@ -104,11 +188,27 @@ def monitor_metrics(state: Dict[str, Any]) -> Dict[str, Any]:
             "error": f"Error monitoring metrics: {str(e)}"
         }
 
+def decode_compact_series(series: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """Decode the packed timestamps and values of a compact-format series into NumPy arrays"""
+    timestamps = np.frombuffer(base64.b64decode(series["timestamps"]), dtype="<f8")
+    values = np.frombuffer(base64.b64decode(series["values"]), dtype="<f8")
+    return timestamps, values
+
 def process_metric_result(result: Dict[str, Any]) -> List[Dict[str, Any]]:
     """Process metric result from Prometheus"""
     processed = []
     
-    if "result" in result:
+    if result.get("format") == "compact":
+        # Keep the latest sample of every series
+        for series in result.get("result", []):
+            timestamps, values = decode_compact_series(series)
+            if len(values):
+                processed.append({
+                    "metric": series.get("metric", {}),
+                    "value": float(values[-1]),
+                    "timestamp": float(timestamps[-1])
+                })
+    elif "result" in result:
         for item in result["result"]:
             metric = item.get("metric", {})
             value = item.get("value", [0, "0"])
@@ -128,94 +228,112 @@ def process_metric_result(result: Dict[str, Any]) -> List[Dict[str, Any]]:
     
     return processed
 
-def analyze_metrics(state: Dict[str, Any]) -> Dict[str, Any]:
-    """Seer Agent: Analyze metrics to detect issues"""
-    if state.get("error"):
-        seer_logger.warning(f"Seer is skipping metrics analysis due to error: {state.get('error')}")
-        return state
-    
-    seer_logger.info("Seer is starting metrics analysis")
-    
-    metrics = state.get("metrics", {})
-    cpu_metrics = metrics.get("cpu", [])
-    memory_metrics = metrics.get("memory", [])
-    pods = metrics.get("pods", [])
+def build_pod_index(pods: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Build a label value -> pod lookup for the current tick
     
-    # Get thresholds from environment or use defaults
-    CPU_THRESHOLD = 10  # CPU usage percentage threshold (lowered to 10% for testing)
-    MEMORY_THRESHOLD = 600000000  # Memory threshold in bytes (500 MB)
-    
-    seer_logger.info(f"Seer analyzing CPU metrics: {json.dumps(cpu_metrics)}")
-    seer_logger.info(f"Seer analyzing memory metrics: {json.dumps(memory_metrics)}")
-    seer_logger.info(f"Seer analyzing pods: {json.dumps(pods)}")
+    Pods are indexed by name and by IP so that series labelled with a pod name,
+    a pod IP or an instance address can be resolved with a single lookup.
+    """
+    index = {}
+    for pod in pods:
+        if pod.get("ip"):
+            index.setdefault(pod["ip"], pod)
+    # Names take precedence over IPs
+    for pod in pods:
+        if pod.get("name"):
+            index[pod["name"]] = pod
+    return index
+
+def resolve_pod(labels: Dict[str, str], pod_index: Dict[str, Dict[str, Any]]) -> Tuple[str, str]:
+    """Resolve a series to a (pod name, namespace) pair using the pod index"""
+    # Prefer explicit pod labels, then the scrape instance and its host
+    for label in ("pod", "pod_name", "instance"):
+        value = labels.get(label)
+        if not value:
+            continue
+        pod = pod_index.get(value) or pod_index.get(value.rsplit(":", 1)[0])
+        if pod:
+            return pod["name"], pod.get("namespace", labels.get("namespace", "default"))
     
+    # Unknown series keep their pod or instance name, as before
+    return labels.get("pod") or labels.get("pod_name") or labels.get("instance", "unknown"), labels.get("namespace", "default")
+
+def calculate_severities(values: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+    """Vectorized calculate_severity over arrays of values and thresholds"""
+    return np.select(
+        [values > thresholds * 1.5, values > thresholds * 1.2],
+        ["high", "medium"],
+        default="low"
+    )
+
+def evaluate_thresholds(metrics: Dict[str, Any], families: List[Dict[str, Any]],
+                        pod_index: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Feed every metric family to the streaming detector and return the sustained anomalies as issues"""
     issues = []
+    now = time.time()
     
-    # Check CPU usage
-    for cpu_metric in cpu_metrics:
-        seer_logger.info(f"Seer checking CPU metric: {json.dumps(cpu_metric)}")
-        if cpu_metric["value"] > CPU_THRESHOLD:
-            seer_logger.info(f"Seer detected CPU usage {cpu_metric['value']} exceeds threshold {CPU_THRESHOLD}")
-            pod_name = cpu_metric["metric"].get("instance", "unknown")
-            namespace = "default"
-            
-            # Find the pod in the list
-            for pod in pods:
-                if pod["name"] in pod_name:
-                    pod_name = pod["name"]
-                    namespace = pod["namespace"]
-                    break
-            
-            seer_logger.info(f"Seer identified pod {pod_name} in namespace {namespace}")
-            
-            issues.append({
-                "type": "cpu",
-                "pod_name": pod_name,
-                "namespace": namespace,
-                "value": cpu_metric["value"],
-                "threshold": CPU_THRESHOLD,
-                "severity": calculate_severity(cpu_metric["value"], CPU_THRESHOLD)
-            })
-    
-    # Check memory usage
-    for memory_metric in memory_metrics:
-        # Get memory value in bytes
-        memory_value = memory_metric["value"]
+    for family in families:
+        samples = metrics.get(family["metric"], [])
+        if not samples:
+            continue
         
-        # Calculate percentage for logging (assuming 1GB = 100%)
-        memory_percent = memory_value / (1024 * 1024 * 1024) * 100
+        values = np.fromiter((sample["value"] for sample in samples), dtype=np.float64, count=len(samples))
+        detection = detector.update(family["type"], [sample["metric"] for sample in samples], values, family["threshold"], now)
         
-        seer_logger.info(f"Seer checking memory metric: {json.dumps(memory_metric)}, value: {memory_value} bytes ({memory_percent:.2f}%)")
+        # A single noisy sample is not enough; only act on anomalies that lasted several ticks
+        anomalous = np.flatnonzero(detection["anomalous"])
+        sustained = anomalous[detection["streak"][anomalous] >= DETECTOR_SUSTAIN_TICKS]
+        seer_logger.info(f"Seer checked {len(samples)} {family['type']} series, {len(anomalous)} anomalous, {len(sustained)} sustained for {DETECTOR_SUSTAIN_TICKS} ticks")
+        if not len(sustained):
+            continue
         
-        if memory_value > MEMORY_THRESHOLD:
-            seer_logger.info(f"Seer detected memory usage {memory_value} bytes exceeds threshold {MEMORY_THRESHOLD} bytes")
-            pod_name = memory_metric["metric"].get("instance", "unknown")
-            namespace = "default"
-            
-            # Find the pod in the list
-            for pod in pods:
-                if pod["name"] in pod_name:
-                    pod_name = pod["name"]
-                    namespace = pod["namespace"]
-                    break
-            
-            seer_logger.info(f"Seer identified pod {pod_name} in namespace {namespace}")
+        thresholds = np.full(len(sustained), family["threshold"], dtype=np.float64)
+        severities = calculate_severities(values[sustained], thresholds)
+        
+        for position, severity in zip(sustained.tolist(), severities.tolist()):
+            value = float(values[position])
+            pod_name, namespace = resolve_pod(samples[position]["metric"], pod_index)
+            seer_logger.info(f"Seer detected sustained {family['type']} anomaly {value} (expected {detection['expected'][position]:.2f}, z-score {detection['zscore'][position]:.2f}) on pod {pod_name} in namespace {namespace}")
             
             issues.append({
-                "type": "memory",
+                "type": family["type"],
                 "pod_name": pod_name,
                 "namespace": namespace,
-                "value": memory_value,
-                "threshold": MEMORY_THRESHOLD,
-                "severity": calculate_severity(memory_value, MEMORY_THRESHOLD)
+                "value": value,
+                "threshold": family["threshold"],
+                "expected": float(detection["expected"][position]),
+                "zscore": float(detection["zscore"][position]),
+                "sustained_ticks": int(detection["streak"][position]),
+                "severity": severity
             })
     
+    return issues
+
+def analyze_metrics(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Seer Agent: Analyze metrics to detect issues"""
+    if state.get("error"):
+        seer_logger.warning(f"Seer is skipping metrics analysis due to error: {state.get('error')}")
+        return state
+    
+    seer_logger.info("Seer is starting metrics analysis")
+    
+    metrics = state.get("metrics", {})
+    pods = metrics.get("pods", [])
+    
+    for family in METRIC_FAMILIES:
+        log_json(seer_logger, f"Seer analyzing {family['type']} metrics: %s", metrics.get(family["metric"], []))
+    log_json(seer_logger, "Seer analyzing pods: %s", pods)
+    
+    # Build the pod lookup once per tick instead of scanning the pod list for every breach
+    pod_index = build_pod_index(pods)
+    issues = evaluate_thresholds(metrics, METRIC_FAMILIES, pod_index)
+    
     analysis = {
         "issues": issues,
         "timestamp": int(time.time())
     }
     
-    seer_logger.info(f"Seer completed analysis: {json.dumps(analysis)}")
+    log_json(seer_logger, "Seer completed analysis: %s", analysis)
     
     if analysis.get("issues", []):
         herald_logger.info(f"Herald: Seer has detected {len(analysis.get('issues', []))} issues requiring attention")
@@ -235,3 +353,90 @@ def calculate_severity(value: float, threshold: float) -> str:
         return "medium"
     else:
         return "low"
+
+# Alert severity labels mapped to issue severities
+ALERT_SEVERITIES = {"critical": "high", "error": "high", "high": "high", "warning": "medium", "medium": "medium", "info": "low", "low": "low"}
+
+def alert_issue_type(labels: Dict[str, str]) -> Optional[str]:
+    """Get the issue type of an alert from its type label or its name"""
+    types = [family["type"] for family in METRIC_FAMILIES]
+    if labels.get("type") in types:
+        return labels["type"]
+    name = (labels.get("alertname") or labels.get("__name__") or "").lower()
+    for issue_type in types:
+        if issue_type in name:
+            return issue_type
+    return None
+
+def alert_value(alert: Dict[str, Any]) -> Optional[float]:
+    """Get the value that triggered an alert, if the payload carries one"""
+    candidates = []
+    # Grafana unified alerting sends the evaluated values per query ref
+    if isinstance(alert.get("values"), dict):
+        candidates.extend(alert["values"].values())
+    candidates.append(alert.get("value"))
+    candidates.append((alert.get("annotations") or {}).get("value"))
+    for candidate in candidates:
+        try:
+            return float(candidate)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+def analysis_from_alerts(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Seer Agent: Build an analysis from an Alertmanager or Grafana webhook payload
+    
+    Supports the Alertmanager webhook format (also used by Grafana unified
+    alerting) and the legacy Grafana format with evalMatches. Resolved alerts
+    and alerts that do not map to a known metric family are skipped.
+    """
+    thresholds = {family["type"]: family["threshold"] for family in METRIC_FAMILIES}
+    alerts = []
+    
+    if isinstance(payload.get("alerts"), list):
+        for alert in payload["alerts"]:
+            if alert.get("status", payload.get("status", "firing")) != "firing":
+                continue
+            alerts.append((alert.get("labels") or {}, alert.get("annotations") or {}, alert_value(alert)))
+    elif isinstance(payload.get("evalMatches"), list) and payload.get("state") == "alerting":
+        for match in payload["evalMatches"]:
+            labels = {"alertname": payload.get("ruleName", ""), **(match.get("tags") or {})}
+            alerts.append((labels, {}, alert_value(match)))
+    
+    issues = []
+    for labels, annotations, value in alerts:
+        issue_type = alert_issue_type(labels)
+        if issue_type is None:
+            seer_logger.info(f"Seer ignoring alert {labels.get('alertname', 'unknown')} that maps to no metric family")
+            continue
+        
+        threshold = alert_value({"value": annotations.get("threshold", labels.get("threshold"))})
+        if threshold is None:
+            threshold = thresholds[issue_type]
+        # Rate the alert like a polled sample when it carries a value, otherwise trust its severity label
+        if value is None:
+            value = threshold
+            severity = ALERT_SEVERITIES.get(str(labels.get("severity", "")).lower(), "medium")
+        else:
+            severity = calculate_severity(value, threshold)
+        
+        pod_name, namespace = resolve_pod(labels, {})
+        
+        issues.append({
+            "type": issue_type,
+            "pod_name": pod_name,
+            "namespace": namespace,
+            "value": value,
+            "threshold": threshold,
+            "severity": severity,
+            "source": "alert",
+            "alertname": labels.get("alertname")
+        })
+    
+    analysis = {
+        "issues": issues,
+        "timestamp": int(time.time())
+    }
+    
+    log_json(seer_logger, "Seer built analysis from alerts: %s", analysis)
+    return analysis
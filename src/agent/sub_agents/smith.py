@@ -10,7 +10,23 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from mcp_client import mcp_manager
 from incident_store import incident_store, Incident
-from sub_agents.logger import smith_logger, forge_logger, vision_logger, herald_logger
+from llm_cache import llm_cache
+from sub_agents.vision import queue_dashboard_annotation
+from sub_agents.logger import smith_logger, forge_logger, herald_logger, log_json
+
+# Version of the code fix and analysis prompts; bump it whenever they change so cached responses are not reused
+SMITH_PROMPT_VERSION = "1"
+
+def invoke_cached(chain, inputs: Dict[str, Any], key: str, step: str) -> str:
+    """Invoke an LLM chain, answering repeat calls with the same inputs from the LLM cache"""
+    cached = llm_cache.get(key)
+    if cached is not None:
+        smith_logger.info(f"Smith reused cached {step} response ({len(cached)} bytes)")
+        return cached
+    
+    result = chain.invoke(inputs)
+    llm_cache.put(key, step, result)
+    return result
 
 def analyze_code(state: Dict[str, Any]) -> Dict[str, Any]:
     """Smith Agent: Analyze code and logs to find the root cause and create a PR"""
@@ -36,7 +52,7 @@ def analyze_code(state: Dict[str, Any]) -> Dict[str, Any]:
     namespace = issue["namespace"]
     issue_type = issue["type"]
     
-    smith_logger.info(f"Smith is analyzing code for issue: {json.dumps(issue)}")
+    log_json(smith_logger, "Smith is analyzing code for issue: %s", issue)
     
     try:
         # Get pod logs
@@ -109,13 +125,16 @@ def analyze_code(state: Dict[str, Any]) -> Dict[str, Any]:
         smith_logger.info("Smith is generating code fix with LLM")
         code_fix_chain = code_fix_prompt | llm | StrOutputParser()
         
-        code_fix_result = code_fix_chain.invoke({
+        model = getattr(llm, "model", None) or getattr(llm, "model_name", None) or type(llm).__name__
+        code_fix_key = llm_cache.make_key("code_fix", SMITH_PROMPT_VERSION, issue_type, app_code, logs,
+                                          model=model, pod_name=pod_name, namespace=namespace)
+        code_fix_result = invoke_cached(code_fix_chain, {
             "pod_name": pod_name,
             "namespace": namespace,
             "issue_type": issue_type,
             "logs": logs,
             "app_code": app_code
-        })
+        }, code_fix_key, "code_fix")
         
         smith_logger.info(f"Smith generated code fix: {len(code_fix_result)} bytes")
         code_fix_result = code_fix_result.replace("```","").replace("python","").replace("json","")
@@ -160,14 +179,17 @@ def analyze_code(state: Dict[str, Any]) -> Dict[str, Any]:
         smith_logger.info("Smith is analyzing and formatting response with LLM")
         analysis_chain = analysis_prompt | llm | StrOutputParser()
         
-        analysis_result = analysis_chain.invoke({
+        analysis_key = llm_cache.make_key("analysis", SMITH_PROMPT_VERSION, issue_type, app_code, logs,
+                                          model=model, pod_name=pod_name, namespace=namespace,
+                                          code_fix=code_fix_result)
+        analysis_result = invoke_cached(analysis_chain, {
             "pod_name": pod_name,
             "namespace": namespace,
             "issue_type": issue_type,
             "logs": logs,
             "app_code": app_code,
             "code_fix": code_fix_result
-        })
+        }, analysis_key, "analysis")
         analysis_result = analysis_result.replace("json","").replace("```","")
         smith_logger.info(f"Smith completed analysis: {len(analysis_result)} bytes")
         
@@ -178,6 +200,8 @@ def analyze_code(state: Dict[str, Any]) -> Dict[str, Any]:
             smith_logger.info("Successfully parsed LLM analysis result")
         except json.JSONDecodeError:
             smith_logger.error("Failed to parse LLM analysis result as JSON")
+            # Don't keep serving a response we can't use
+            llm_cache.invalidate(analysis_key)
             analysis_data = {
                 "analysis": "Failed to parse analysis result",
                 "fix_description": "Unknown",
@@ -299,29 +323,6 @@ spec:
         
         commit_message = f"Fix high {issue_type} usage in {pod_name}"
         
-        # Create the branch first
-        smith_logger.info(f"Smith is creating branch {branch_name}")
-        try:
-            branch_result = mcp_manager.use_tool("github", "create_branch", {
-                "branch": branch_name,
-                "base": "develop"  # Use develop as the base branch
-            })
-            smith_logger.info(f"Smith created branch: {json.dumps(branch_result)}")
-            
-            # Create the file in the new branch
-            smith_logger.info(f"Smith is creating file {file_path} in branch {branch_name}")
-            file_result = mcp_manager.use_tool("github", "create_file", {
-                "path": file_path,
-                "content": file_content,
-                "message": commit_message,
-                "branch": branch_name
-            })
-            smith_logger.info(f"Smith created file: {json.dumps(file_result)}")
-        except Exception as e:
-            smith_logger.error(f"Smith encountered error creating branch or file: {str(e)}")
-            file_result = {"error": str(e)}
-        
-        # Create the pull request
         pr_title = analysis_data.get("pr_title", f"Fix high {issue_type} usage in {pod_name}")
         pr_body = analysis_data.get("pr_body", f"""
 # Fix for high {issue_type} usage in {pod_name}
@@ -338,14 +339,22 @@ This PR addresses the high {issue_type} usage issue in pod {pod_name}.
 Closes #{github_issue.get("number", 0)}
         """)
         
-        smith_logger.info(f"Smith is creating pull request: {pr_title}")
-        pr_result = mcp_manager.use_tool("github", "create_pull_request", {
-            "title": pr_title,
-            "body": pr_body,
-            "head": branch_name,
-            "base": "develop"  # Use develop as the base branch
+        # Commit the fix to a new branch and open the pull request in one call
+        smith_logger.info(f"Smith is committing {file_path} to branch {branch_name} and creating pull request: {pr_title}")
+        commit_result = mcp_manager.use_tool("github", "commit_changes", {
+            "branch": branch_name,
+            "base": "develop",  # Use develop as the base branch
+            "message": commit_message,
+            "files": [{"path": file_path, "content": file_content}],
+            "pull_request": {
+                "title": pr_title,
+                "body": pr_body
+            }
         })
-        smith_logger.info(f"Smith created pull request: {json.dumps(pr_result)}")
+        log_json(smith_logger, "Smith committed changes: %s", commit_result)
+        if commit_result.get("error"):
+            smith_logger.error(f"Smith encountered error committing the fix: {commit_result['error']}")
+        pr_result = commit_result.get("pull_request") or {"error": commit_result.get("error", "Pull request not created")}
         
         # Create incident record
         incident_id = str(uuid.uuid4())
@@ -369,17 +378,15 @@ Closes #{github_issue.get("number", 0)}
         incident_store.add_incident(incident)
         forge_logger.info(f"Forge created incident record {incident_id}")
         
-        # Create Grafana annotation
+        # Queue the Grafana annotation; the GitHub issue above stays synchronous because the branch and PR need its number
         dashboard_id = 1  # Assuming dashboard ID 1 for the test application dashboard
-        vision_logger.info(f"Vision is updating dashboard {dashboard_id} with analysis for {pod_name}")
-        annotation_result = mcp_manager.use_tool("grafana", "create_annotation", {
-            "dashboard_id": dashboard_id,
-            "time": int(time.time() * 1000),  # Convert to milliseconds
-            "text": f"Code analysis for pod {pod_name} due to persistent high {issue_type} usage",
-            "tags": [issue_type, "analysis", "pr-created"]
-        })
-        vision_logger.info(f"Vision created dashboard annotation: {json.dumps(annotation_result)}")
-        herald_logger.info(f"Herald: Vision has updated the monitoring dashboard with code analysis for {pod_name}")
+        annotation_key = f"annotation:{incident_id}"
+        queue_dashboard_annotation(
+            annotation_key,
+            dashboard_id,
+            f"Code analysis for pod {pod_name} due to persistent high {issue_type} usage",
+            [issue_type, "analysis", "pr-created"]
+        )
         
         action = {
             "type": "analyze_code",
@@ -390,7 +397,7 @@ Closes #{github_issue.get("number", 0)}
             "github_issue": github_issue,
             "github_pr": pr_result,
             "incident_id": incident_id,
-            "annotation": annotation_result
+            "annotation_key": annotation_key
         }
         
         smith_logger.info(f"Smith completed code analysis successfully")
@@ -401,7 +408,7 @@ Closes #{github_issue.get("number", 0)}
             "action": action
         }
     except Exception as e:
-        smith_logger.error(f"Error analyzing code: {str(e)}")
+        smith_logger.error(f"Error analyzing code: {str(e)}", exc_info=True)
         return {
             **state,
             "error": f"Error analyzing code: {str(e)}"
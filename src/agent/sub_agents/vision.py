@@ -1,11 +1,154 @@
-import json
-from typing import Dict, List, Any, Optional
+import time as time_module
+import hashlib
+import threading
+from typing import Dict, List, Any, Optional, Tuple
 
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from mcp_client import mcp_manager
-from sub_agents.logger import vision_logger, herald_logger
+from outbox import outbox
+from incident_store import add_incident_note
+from sub_agents.logger import vision_logger, herald_logger, log_json
+
+# Annotation coalescing settings
+ANNOTATION_BATCH_WINDOW = float(os.environ.get("ANNOTATION_BATCH_WINDOW", "1"))  # Seconds to collect annotations into one batch
+ANNOTATION_BATCH_MAX = int(os.environ.get("ANNOTATION_BATCH_MAX", "50"))
+ANNOTATION_MERGE = os.environ.get("ANNOTATION_MERGE", "true").lower() == "true"
+
+class AnnotationCoalescer:
+    """Collects dashboard annotations into batches
+    
+    Annotations queued within ANNOTATION_BATCH_WINDOW of the first one (or
+    until ANNOTATION_BATCH_MAX are waiting) are handed to the outbox as a
+    single create_annotations_batch call by a background flush thread, so a
+    burst of incidents turns into one Grafana MCP request. Annotations only
+    become durable once their batch is in the outbox.
+    """
+    
+    def __init__(self, window: float = ANNOTATION_BATCH_WINDOW, max_size: int = ANNOTATION_BATCH_MAX,
+                 merge: bool = ANNOTATION_MERGE):
+        self.window = window
+        self.max_size = max_size
+        self.merge = merge
+        self._cond = threading.Condition()
+        self._pending: List[Tuple[str, Dict[str, Any]]] = []
+        self._first_queued = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self.queued = 0
+        self.batches = 0
+    
+    def add(self, key: str, annotation: Dict[str, Any]):
+        """Queue an annotation under an idempotency key"""
+        with self._cond:
+            if any(pending_key == key for pending_key, _ in self._pending):
+                return
+            if not self._pending:
+                self._first_queued = time_module.time()
+            self._pending.append((key, annotation))
+            self.queued += 1
+            
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="vision-annotations", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+    
+    def _take_due(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Wait for a full batch or the end of the window and take it"""
+        with self._cond:
+            while True:
+                if self._pending:
+                    remaining = self._first_queued + self.window - time_module.time()
+                    if remaining <= 0 or len(self._pending) >= self.max_size:
+                        batch = self._pending[:self.max_size]
+                        self._pending = self._pending[self.max_size:]
+                        self._first_queued = time_module.time()
+                        return batch
+                    self._cond.wait(remaining)
+                else:
+                    self._cond.wait()
+    
+    def _run(self):
+        """Flush thread: hand each batch to the outbox"""
+        while True:
+            batch = self._take_due()
+            try:
+                self._send(batch)
+            except Exception as e:
+                vision_logger.error(f"Vision failed to queue {len(batch)} annotations: {str(e)}", exc_info=True)
+    
+    def _send(self, batch: List[Tuple[str, Dict[str, Any]]]):
+        """Queue one batch in the outbox, keyed by the keys of its annotations"""
+        keys = [key for key, _ in batch]
+        batch_key = "annotations:" + hashlib.sha1("\n".join(keys).encode()).hexdigest()
+        annotations = [annotation for _, annotation in batch]
+        outbox.enqueue(batch_key, "grafana", "create_annotations_batch", {
+            "annotations": annotations,
+            "merge": self.merge
+        }, handler="annotation_batch", context={"keys": keys, "annotations": annotations})
+        self.batches += 1
+        vision_logger.info(f"Vision queued a batch of {len(batch)} dashboard annotations as {batch_key}")
+    
+    def flush(self):
+        """Queue everything that is waiting right away"""
+        with self._cond:
+            batch, self._pending = self._pending, []
+        for start in range(0, len(batch), self.max_size):
+            self._send(batch[start:start + self.max_size])
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics"""
+        with self._cond:
+            return {
+                "waiting": len(self._pending),
+                "queued": self.queued,
+                "batches": self.batches,
+                "window": self.window
+            }
+
+def requeue_failed_annotations(result: Dict[str, Any], context: Dict[str, Any]):
+    """Outbox handler: retry the annotations of a delivered batch that Grafana rejected
+    
+    The batch itself succeeded, so retrying it would duplicate the annotations
+    that were created; the failed ones are queued on their own instead, under
+    this same handler so that giving up on them is recorded as well.
+    """
+    for key, annotation, item in zip(context["keys"], context["annotations"], result.get("results", [])):
+        if item.get("error"):
+            vision_logger.warning(f"Vision is retrying annotation {key} on its own: {item['error']}")
+            outbox.enqueue(key, "grafana", "create_annotation", annotation,
+                           handler="annotation_batch", context={"keys": [key], "annotations": [annotation]})
+
+def record_lost_annotations(failure: Dict[str, Any], context: Dict[str, Any]):
+    """Outbox failure handler: note on their incidents that annotations were given up on"""
+    for key in context["keys"]:
+        vision_logger.error(f"Vision dropped annotation {key} after {failure['attempts']} attempts: {failure['error']}")
+        if key.startswith("annotation:"):
+            add_incident_note(key.split(":", 1)[1], f"Dashboard annotation was not created: {failure['error']}")
+
+outbox.register_handler("annotation_batch", requeue_failed_annotations, on_failure=record_lost_annotations)
+
+# Global coalescer shared by every agent run
+annotation_coalescer = AnnotationCoalescer()
+
+def queue_dashboard_annotation(
+    key: str,
+    dashboard_id: int,
+    text: str,
+    tags: List[str],
+    time: Optional[int] = None
+):
+    """Vision Agent: Queue a dashboard annotation for batched background delivery"""
+    if time is None:
+        time = int(time_module.time() * 1000)
+    
+    vision_logger.info(f"Vision is queueing dashboard {dashboard_id} annotation {key}")
+    annotation_coalescer.add(key, {
+        "dashboard_id": dashboard_id,
+        "time": time,
+        "text": text,
+        "tags": tags
+    })
 
 def create_dashboard_annotation(
     dashboard_id: int,
@@ -18,7 +161,6 @@ def create_dashboard_annotation(
     
     # If time is not provided, use current time in milliseconds
     if time is None:
-        import time as time_module
         time = int(time_module.time() * 1000)
     
     try:
@@ -30,7 +172,7 @@ def create_dashboard_annotation(
             "tags": tags
         })
         
-        vision_logger.info(f"Vision created dashboard annotation: {json.dumps(annotation_result)}")
+        log_json(vision_logger, "Vision created dashboard annotation: %s", annotation_result)
         herald_logger.info(f"Herald: Vision has updated the monitoring dashboard with annotation: {text}")
         
         return annotation_result
@@ -56,7 +198,7 @@ def update_dashboard_panel(
             "description": description
         })
         
-        vision_logger.info(f"Vision updated dashboard panel: {json.dumps(update_result)}")
+        log_json(vision_logger, "Vision updated dashboard panel: %s", update_result)
         herald_logger.info(f"Herald: Vision has updated panel {panel_id} in dashboard {dashboard_id}")
         
         return update_result
@@ -0,0 +1,103 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The agent modules create their stores in the working directory on import
+_tmp_dir = tempfile.TemporaryDirectory()
+os.chdir(_tmp_dir.name)
+
+from outbox import Outbox
+from incident_store import IssueIndex, issue_fingerprint
+from sub_agents import medic
+
+class GitHubClient:
+    """Stands in for the MCP manager, failing create_issue until told otherwise"""
+
+    def __init__(self):
+        self.available = False
+        self.calls = []
+
+    def use_tool(self, server, tool, arguments):
+        self.calls.append((tool, arguments))
+        if not self.available:
+            return {"error": "GitHub is unavailable"}
+        if tool == "create_issue":
+            return {"number": 7, "title": arguments["title"], "url": "", "html_url": ""}
+        return {}
+
+class FailedIssueCreateTest(unittest.TestCase):
+    """A create_issue the outbox gives up on must not strand the repeats held for it"""
+
+    def setUp(self):
+        self.client = GitHubClient()
+        self.outbox = Outbox(os.path.join(_tmp_dir.name, f"{self.id()}.db"), workers=0,
+                             client=self.client, max_attempts=1)
+        self.outbox.register_handler("incident_github_issue", medic.attach_github_issue,
+                                     on_failure=medic.retry_github_issue)
+        self.index = IssueIndex(os.path.join(_tmp_dir.name, f"{self.id()}.json"))
+        self.fingerprint = issue_fingerprint("default", "app", "cpu")
+
+        patches = [
+            mock.patch.object(medic, "outbox", self.outbox),
+            mock.patch.object(medic, "issue_index", self.index)
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.assertEqual(self.index.track(self.fingerprint, "inc-1", "first")[0], "create")
+        self.outbox.enqueue("github_issue:inc-1", "github", "create_issue", {
+            "title": "CPU usage alert for pod app",
+            "body": "Body\n" + medic.FINGERPRINT_MARKER.format(self.fingerprint),
+            "labels": ["cpu"]
+        }, handler="incident_github_issue", context={"incident_id": "inc-1", "fingerprint": self.fingerprint})
+        self.assertEqual(self.index.track(self.fingerprint, "inc-2", "repeat 2")[0], "pending")
+
+    def deliver_next(self):
+        self.outbox._deliver(self.outbox._claim())
+
+    def test_failed_create_is_queued_again_with_held_comments(self):
+        self.deliver_next()
+
+        retry = self.outbox.get("github_issue:inc-1:retry1")
+        self.assertIsNotNone(retry)
+        self.assertIn("repeat 2", retry["arguments"]["body"])
+        self.assertTrue(retry["arguments"]["body"].endswith(medic.FINGERPRINT_MARKER.format(self.fingerprint)))
+        self.assertEqual(retry["context"]["incident_ids"], ["inc-2"])
+
+        # Repeats keep being held for the retried issue and are posted once it exists
+        self.assertEqual(self.index.track(self.fingerprint, "inc-3", "repeat 3")[0], "pending")
+        self.client.available = True
+        self.deliver_next()
+
+        self.assertEqual(self.index.entries[self.fingerprint]["issue"]["number"], 7)
+        comment = self.outbox.get("github_comment:inc-1")
+        self.assertEqual(comment["arguments"], {"issue_number": 7, "body": "repeat 3"})
+
+    def test_fingerprint_is_released_after_the_last_retry(self):
+        with mock.patch.object(medic, "MEDIC_ISSUE_CREATE_RETRIES", 0):
+            self.deliver_next()
+
+        self.assertIsNone(self.outbox.get("github_issue:inc-1:retry1"))
+        self.assertNotIn(self.fingerprint, self.index.entries)
+        self.assertEqual(self.index.track(self.fingerprint, "inc-3", "repeat 3")[0], "create")
+
+class StaleIssueEntryTest(unittest.TestCase):
+    """An issue pending for too long is opened again without dropping its held comments"""
+
+    def test_stale_entry_keeps_held_comments(self):
+        index = IssueIndex(os.path.join(_tmp_dir.name, "stale.json"), pending_timeout=60)
+        fingerprint = issue_fingerprint("default", "app", "memory")
+        index.track(fingerprint, "inc-1", "first")
+        index.track(fingerprint, "inc-2", "repeat 2")
+        index.entries[fingerprint]["created"] -= 120
+
+        self.assertEqual(index.track(fingerprint, "inc-3", "repeat 3")[0], "create")
+        self.assertEqual(index.resolve(fingerprint, {"number": 8}), (["inc-2"], ["repeat 2"]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,13 @@
 import os
 import json
 import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Any, Union
 from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel, Field
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 from grafana_api.grafana_face import GrafanaFace
 
@@ -64,6 +67,24 @@ def get_auth_headers():
     
     return headers
 
+# Grafana connection settings
+GRAFANA_TIMEOUT = float(os.environ.get("GRAFANA_TIMEOUT", "10"))
+GRAFANA_MAX_CONNECTIONS = int(os.environ.get("GRAFANA_MAX_CONNECTIONS", "4"))
+MAX_BATCH_ANNOTATIONS = int(os.environ.get("MAX_BATCH_ANNOTATIONS", "100"))
+
+def create_http_session() -> requests.Session:
+    """Create the pooled session used for every Grafana request"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=GRAFANA_MAX_CONNECTIONS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(get_auth_headers())
+    return session
+
+# Shared keep-alive session; blocking calls run on a pool sized to its connections
+http_session = create_http_session()
+grafana_executor = ThreadPoolExecutor(max_workers=GRAFANA_MAX_CONNECTIONS, thread_name_prefix="grafana")
+
 # MCP Models
 class MCPToolInput(BaseModel):
     """Base model for MCP tool inputs"""
@@ -141,6 +162,18 @@ class AnnotationOutput(MCPToolOutput):
     tags: List[str]
     text: str
 
+class CreateAnnotationsBatchInput(MCPToolInput):
+    annotations: List[CreateAnnotationInput] = Field(..., description="Annotations to create")
+    merge: bool = Field(False, description="Merge annotations with the same dashboard and tags into one")
+
+class AnnotationBatchResult(BaseModel):
+    annotation: Optional[AnnotationOutput] = None
+    error: Optional[str] = None
+
+class CreateAnnotationsBatchOutput(MCPToolOutput):
+    results: List[AnnotationBatchResult]
+    created: int
+
 class AlertListInput(MCPToolInput):
     dashboard_id: Optional[int] = Field(None, description="Filter by dashboard ID")
     panel_id: Optional[int] = Field(None, description="Filter by panel ID")
@@ -178,11 +211,10 @@ async def list_dashboards(input_data: DashboardListInput):
             params["limit"] = input_data.limit
         
         # Use direct requests instead of the library
-        headers = get_auth_headers()
         api_url = f"{parsed_url}/api/search"
         print(f"Listing dashboards from: {api_url}")
         
-        response = requests.get(api_url, params=params, headers=headers)
+        response = http_session.get(api_url, params=params, timeout=GRAFANA_TIMEOUT)
         response.raise_for_status()
         search_result = response.json()
         
@@ -213,11 +245,10 @@ async def get_dashboard(input_data: GetDashboardInput):
     """Get a Grafana dashboard by UID"""
     try:
         # Use direct requests instead of the library
-        headers = get_auth_headers()
         api_url = f"{parsed_url}/api/dashboards/uid/{input_data.uid}"
         print(f"Getting dashboard from: {api_url}")
         
-        response = requests.get(api_url, headers=headers)
+        response = http_session.get(api_url, timeout=GRAFANA_TIMEOUT)
         response.raise_for_status()
         result = response.json()
         
@@ -253,95 +284,119 @@ async def get_dashboard(input_data: GetDashboardInput):
         print(f"Error getting dashboard: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def post_annotation(input_data: CreateAnnotationInput) -> AnnotationOutput:
+    """Create one annotation over the pooled session
+    
+    Annotations are created without dashboardId, which is the form every
+    Grafana setup accepts; the dashboard ID is only echoed in the output.
+    """
+    annotation = {
+        "time": input_data.time,
+        "text": input_data.text,
+        "tags": input_data.tags or []
+    }
+    
+    if input_data.time_end:
+        annotation["timeEnd"] = input_data.time_end
+    
+    response = http_session.post(f"{parsed_url}/api/annotations", json=annotation, timeout=GRAFANA_TIMEOUT)
+    response.raise_for_status()
+    result = response.json()
+    
+    return AnnotationOutput(
+        id=result.get("id", 0),
+        dashboard_id=input_data.dashboard_id,
+        time=input_data.time,
+        time_end=input_data.time_end,
+        tags=input_data.tags or [],
+        text=input_data.text
+    )
+
+def merge_annotations(annotations: List[CreateAnnotationInput]) -> List[tuple]:
+    """Group annotations by dashboard and tags
+    
+    Returns (merged annotation, indexes of the inputs it covers) pairs in order
+    of first appearance. A merged annotation starts at the earliest time and
+    lists the texts of its members, one per line.
+    """
+    groups: Dict[tuple, List[int]] = {}
+    for index, annotation in enumerate(annotations):
+        key = (annotation.dashboard_id, tuple(sorted(annotation.tags or [])))
+        groups.setdefault(key, []).append(index)
+    
+    merged = []
+    for indexes in groups.values():
+        members = [annotations[index] for index in indexes]
+        if len(members) == 1:
+            merged.append((members[0], indexes))
+            continue
+        ends = [member.time_end for member in members if member.time_end]
+        merged.append((CreateAnnotationInput(
+            dashboard_id=members[0].dashboard_id,
+            time=min(member.time for member in members),
+            time_end=max(ends) if ends else None,
+            tags=members[0].tags,
+            text="\n".join(member.text for member in members)
+        ), indexes))
+    return merged
+
 @app.post("/mcp/tools/create_annotation", response_model=AnnotationOutput)
 async def create_annotation(input_data: CreateAnnotationInput):
     """Create a Grafana annotation"""
     try:
-        annotation = {
-            "dashboardId": input_data.dashboard_id,
-            "time": input_data.time,
-            "text": input_data.text,
-            "tags": input_data.tags or []
-        }
-        
-        if input_data.time_end:
-            annotation["timeEnd"] = input_data.time_end
-        
-        # Use direct requests instead of the library to have better error handling
-        headers = get_auth_headers()
-        
-        # Ensure the URL is properly formatted
-        api_url = f"{parsed_url}/api/annotations"
-        print(f"Creating annotation at: {api_url}")
-        print(f"Annotation data: {json.dumps(annotation)}")
-        print(f"Headers: {json.dumps({k: v for k, v in headers.items() if k != 'Authorization'})}")
-        
-        # Try a simpler annotation first to test connectivity
-        test_annotation = {
-            "time": input_data.time,
-            "text": input_data.text,
-            "tags": input_data.tags or []
-        }
-        
-        print(f"Trying simpler annotation without dashboardId: {json.dumps(test_annotation)}")
-        
-        try:
-            response = requests.post(api_url, json=test_annotation, headers=headers)
-            response.raise_for_status()
-            result = response.json()
-            print(f"Annotation created successfully: {json.dumps(result)}")
-            
-            return AnnotationOutput(
-                id=result.get("id", 0),
-                dashboard_id=input_data.dashboard_id,
-                time=input_data.time,
-                time_end=input_data.time_end,
-                tags=input_data.tags or [],
-                text=input_data.text
-            )
-        except requests.exceptions.RequestException as e:
-            print(f"Error creating annotation: {str(e)}")
-            if hasattr(e, 'response') and e.response is not None:
-                print(f"Response status code: {e.response.status_code}")
-                print(f"Response text: {e.response.text}")
-            
-            # Fall back to creating a global annotation without dashboardId
-            print("Falling back to creating a global annotation")
-            
-            # Create a global annotation (without dashboardId)
-            global_annotation = {
-                "time": input_data.time,
-                "text": f"[{input_data.dashboard_id}] {input_data.text}",
-                "tags": input_data.tags or []
-            }
-            
-            if input_data.time_end:
-                global_annotation["timeEnd"] = input_data.time_end
-            
-            try:
-                response = requests.post(api_url, json=global_annotation, headers=headers)
-                response.raise_for_status()
-                result = response.json()
-                print(f"Global annotation created successfully: {json.dumps(result)}")
-                
-                return AnnotationOutput(
-                    id=result.get("id", 0),
-                    dashboard_id=0,  # No dashboard ID for global annotations
-                    time=input_data.time,
-                    time_end=input_data.time_end,
-                    tags=input_data.tags or [],
-                    text=input_data.text
-                )
-            except requests.exceptions.RequestException as e2:
-                print(f"Error creating global annotation: {str(e2)}")
-                if hasattr(e2, 'response') and e2.response is not None:
-                    print(f"Response status code: {e2.response.status_code}")
-                    print(f"Response text: {e2.response.text}")
-                raise HTTPException(status_code=500, detail=f"Failed to create annotation: {str(e2)}")
+        print(f"Creating annotation: {json.dumps(input_data.model_dump())}")
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(grafana_executor, post_annotation, input_data)
+        print(f"Annotation created successfully: {result.id}")
+        return result
+    except requests.exceptions.RequestException as e:
+        print(f"Error creating annotation: {str(e)}")
+        if e.response is not None:
+            print(f"Response status code: {e.response.status_code}")
+            print(f"Response text: {e.response.text}")
+        raise HTTPException(status_code=500, detail=f"Failed to create annotation: {str(e)}")
     except Exception as e:
         print(f"Unexpected error creating annotation: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/mcp/tools/create_annotations_batch", response_model=CreateAnnotationsBatchOutput)
+async def create_annotations_batch(input_data: CreateAnnotationsBatchInput):
+    """Create several Grafana annotations in one call
+    
+    Grafana has no bulk annotation endpoint, so the annotations are posted
+    concurrently over the pooled session, at most GRAFANA_MAX_CONNECTIONS at
+    a time. With `merge`, annotations sharing a dashboard and tags become a
+    single write. Failures are reported per annotation.
+    """
+    if len(input_data.annotations) > MAX_BATCH_ANNOTATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_ANNOTATIONS} annotations per batch")
+    
+    if input_data.merge:
+        writes = merge_annotations(input_data.annotations)
+    else:
+        writes = [(annotation, [index]) for index, annotation in enumerate(input_data.annotations)]
+    
+    print(f"Creating {len(writes)} annotations for a batch of {len(input_data.annotations)}")
+    loop = asyncio.get_running_loop()
+    outcomes = await asyncio.gather(
+        *(loop.run_in_executor(grafana_executor, post_annotation, annotation) for annotation, _ in writes),
+        return_exceptions=True
+    )
+    
+    results: List[Optional[AnnotationBatchResult]] = [None] * len(input_data.annotations)
+    created = 0
+    for (annotation, indexes), outcome in zip(writes, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"Error creating annotation in batch: {str(outcome)}")
+            for index in indexes:
+                results[index] = AnnotationBatchResult(error=str(outcome))
+            continue
+        created += 1
+        for index in indexes:
+            results[index] = AnnotationBatchResult(annotation=outcome)
+    
+    return CreateAnnotationsBatchOutput(results=results, created=created)
+
 @app.post("/mcp/tools/list_alerts", response_model=AlertListOutput)
 async def list_alerts(input_data: AlertListInput):
     """List Grafana alerts"""
@@ -359,12 +414,11 @@ async def list_alerts(input_data: AlertListInput):
             params["limit"] = input_data.limit
         
         # Use direct requests instead of the library
-        headers = get_auth_headers()
         
         # Ensure the URL is properly formatted
         api_url = f"{parsed_url}/api/alerts"
         print(f"Making request to: {api_url}")
-        response = requests.get(api_url, params=params, headers=headers)
+        response = http_session.get(api_url, params=params, timeout=GRAFANA_TIMEOUT)
         response.raise_for_status()
         alerts_data = response.json()
         
@@ -433,6 +487,31 @@ async def get_schema():
                     "required": ["dashboard_id", "time", "text"]
                 }
             },
+            {
+                "name": "create_annotations_batch",
+                "description": "Create several Grafana annotations in one call, optionally merging those with the same dashboard and tags",
+                "input_schema": {
+                    "type": "object",
+                    "properties": {
+                        "annotations": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "dashboard_id": {"type": "integer"},
+                                    "time": {"type": "integer"},
+                                    "time_end": {"type": "integer"},
+                                    "tags": {"type": "array", "items": {"type": "string"}},
+                                    "text": {"type": "string"}
+                                },
+                                "required": ["dashboard_id", "time", "text"]
+                            }
+                        },
+                        "merge": {"type": "boolean"}
+                    },
+                    "required": ["annotations"]
+                }
+            },
             {
                 "name": "list_alerts",
                 "description": "List Grafana alerts",
@@ -451,6 +530,12 @@ async def get_schema():
         "resources": []
     }
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the pooled Grafana session on shutdown"""
+    grafana_executor.shutdown(wait=False)
+    http_session.close()
+
 # Health check endpoint
 @app.get("/health")
 async def health():
@@ -1,7 +1,11 @@
 import os
 import json
 import time
+import uuid
+import asyncio
 import requests
+import httpx
+from collections import OrderedDict
 from typing import Dict, List, Optional, Any
 from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel, Field
@@ -12,6 +16,13 @@ app = FastAPI(title="Kubernetes MCP Server", description="MCP server for Kuberne
 # Configuration
 TEST_APP_URL = "http://api:8000"  # URL of the test application (using the api service)
 
+# Restart operation settings
+RESTART_DOWN_TIMEOUT = float(os.environ.get("RESTART_DOWN_TIMEOUT", "5"))  # Seconds to wait for the container to go down
+RESTART_READY_TIMEOUT = float(os.environ.get("RESTART_READY_TIMEOUT", "30"))  # Seconds to wait for it to become ready again
+RESTART_BACKOFF_INITIAL = float(os.environ.get("RESTART_BACKOFF_INITIAL", "0.1"))
+RESTART_BACKOFF_MAX = float(os.environ.get("RESTART_BACKOFF_MAX", "2"))
+MAX_OPERATIONS = int(os.environ.get("MAX_OPERATIONS", "1000"))  # Completed operations kept for get_operation
+
 # MCP Models
 class MCPToolInput(BaseModel):
     """Base model for MCP tool inputs"""
@@ -24,10 +35,30 @@ class MCPToolOutput(BaseModel):
 class PodRestartInput(MCPToolInput):
     namespace: str = Field(default="default", description="Kubernetes namespace")
     pod_name: str = Field(..., description="Name of the pod to restart")
+    wait: bool = Field(default=False, description="Wait for the restart to complete before returning")
+    timeout: float = Field(default=30, description="Maximum number of seconds to wait when wait is true")
 
 class PodRestartOutput(MCPToolOutput):
     success: bool
     message: str
+    operation_id: Optional[str] = None
+    status: Optional[str] = None
+
+class GetOperationInput(MCPToolInput):
+    operation_id: str = Field(..., description="Operation id returned by restart_pod")
+    wait: bool = Field(default=False, description="Wait for the operation to complete before returning")
+    timeout: float = Field(default=30, description="Maximum number of seconds to wait when wait is true")
+
+class OperationOutput(MCPToolOutput):
+    operation_id: str
+    type: str
+    pod_name: str
+    namespace: str
+    status: str  # pending, running, succeeded or failed
+    message: str
+    created_at: float
+    updated_at: float
+    completed_at: Optional[float] = None
 
 class PodListInput(MCPToolInput):
     namespace: str = Field(default="default", description="Kubernetes namespace")
@@ -83,84 +114,170 @@ def is_test_app_available():
     except:
         return False
 
-# MCP Protocol Routes
-import subprocess
+# Restart operations
+operations: "OrderedDict[str, OperationOutput]" = OrderedDict()
+operation_tasks: Dict[str, asyncio.Task] = {}
+active_restarts: Dict[str, str] = {}  # "namespace/pod" -> id of the restart in progress
+http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client for the test application"""
+    global http_client
+    if http_client is None:
+        http_client = httpx.AsyncClient(base_url=TEST_APP_URL)
+    return http_client
+
+def update_operation(operation: OperationOutput, status: str, message: str):
+    """Update the status of an operation"""
+    operation.status = status
+    operation.message = message
+    operation.updated_at = time.time()
+    if status in ("succeeded", "failed"):
+        operation.completed_at = operation.updated_at
+    print(f"[Kubernetes MCP] Operation {operation.operation_id}: {status} - {message}")
+
+def prune_operations():
+    """Drop the oldest completed operations beyond MAX_OPERATIONS"""
+    for operation_id in list(operations):
+        if len(operations) <= MAX_OPERATIONS:
+            break
+        if operations[operation_id].completed_at is not None:
+            del operations[operation_id]
+
+async def check_health() -> bool:
+    """Check if the test application is ready"""
+    try:
+        response = await get_http_client().get("/health", timeout=1)
+        return response.status_code == 200
+    except httpx.HTTPError:
+        return False
 
-@app.post("/mcp/tools/restart_pod", response_model=PodRestartOutput)
-async def restart_pod(input_data: PodRestartInput):
-    """Restart a pod by actually restarting the Docker container"""
+async def wait_for_health(ready: bool, timeout: float) -> Optional[float]:
+    """Poll the health endpoint with exponential backoff until it reports `ready`
+    
+    Returns the number of seconds it took, or None on timeout.
+    """
+    started = time.monotonic()
+    delay = RESTART_BACKOFF_INITIAL
+    while True:
+        if await check_health() == ready:
+            return time.monotonic() - started
+        remaining = timeout - (time.monotonic() - started)
+        if remaining <= 0:
+            return None
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 2, RESTART_BACKOFF_MAX)
+
+async def run_restart(operation: OperationOutput):
+    """Restart the test application container and watch it become ready again"""
+    client = get_http_client()
     try:
-        # Check if test app is available
-        # if not is_test_app_available():
-        #     return PodRestartOutput(
-        #         success=False,
-        #         message="Test application is not available"
-        #     )
-        
-        print(f"[Kubernetes MCP] Restarting pod {input_data.pod_name} in namespace {input_data.namespace}")
+        update_operation(operation, "running", "Stopping active simulations")
         print(f"[Kubernetes MCP] In a real K8s environment, this would terminate and recreate the pod")
         print(f"[Kubernetes MCP] In this simulation, we'll actually restart the Docker container")
         
         # First try to stop any active simulations
         try:
-            response = requests.post(f"{TEST_APP_URL}/simulate/stop", timeout=2)
+            response = await client.post("/simulate/stop", timeout=2)
             print(f"[Kubernetes MCP] Sent stop signal to simulations: {response.status_code}")
-        except Exception as e:
+        except httpx.HTTPError as e:
             print(f"[Kubernetes MCP] Failed to send stop signal: {str(e)}")
         
         # Call the shutdown endpoint to force the container to exit and restart
+        update_operation(operation, "running", "Shutting down container")
         try:
-            print(f"[Kubernetes MCP] Calling shutdown endpoint to force container restart")
-            shutdown_response = requests.post(f"{TEST_APP_URL}/admin/shutdown", timeout=2)
+            shutdown_response = await client.post("/admin/shutdown", timeout=2)
             print(f"[Kubernetes MCP] Shutdown response: {shutdown_response.status_code}")
-            
-            # Wait for the container to go down and come back up
-            print(f"[Kubernetes MCP] Waiting for API container to restart")
-            
-            # First wait for it to go down
-            down = False
-            for i in range(5):  # Try for 5 seconds
-                try:
-                    time.sleep(1)
-                    health_check = requests.get(f"{TEST_APP_URL}/health", timeout=1)
-                    # If we get here, it's still up
-                except:
-                    # If we get an exception, it's down
-                    down = True
-                    print(f"[Kubernetes MCP] API container is down after {i+1} seconds")
-                    break
-            
-            if not down:
-                print(f"[Kubernetes MCP] API container did not go down after 5 seconds")
-            
-            # Now wait for it to come back up
-            max_retries = 15  # Wait up to 15 seconds for it to come back
-            for i in range(max_retries):
-                try:
-                    time.sleep(1)
-                    health_check = requests.get(f"{TEST_APP_URL}/health", timeout=1)
-                    if health_check.status_code == 200:
-                        print(f"[Kubernetes MCP] API container is back up after {i+1} seconds")
-                        break
-                except:
-                    if i == max_retries - 1:
-                        print(f"[Kubernetes MCP] API container did not come back up after {max_retries} seconds")
-            
-            return PodRestartOutput(
-                success=True,
-                message=f"Pod {input_data.pod_name} in namespace {input_data.namespace} restarted successfully"
-            )
-        except subprocess.CalledProcessError as e:
-            print(f"[Kubernetes MCP] Docker restart command failed: {e.stderr}")
-            return PodRestartOutput(
-                success=False,
-                message=f"Failed to restart pod: {e.stderr}"
-            )
+        except httpx.HTTPError as e:
+            # The container may drop the connection while exiting
+            print(f"[Kubernetes MCP] Shutdown request ended with: {str(e)}")
+        
+        # First wait for it to go down
+        down_after = await wait_for_health(False, RESTART_DOWN_TIMEOUT)
+        if down_after is None:
+            print(f"[Kubernetes MCP] API container did not go down after {RESTART_DOWN_TIMEOUT} seconds")
+        else:
+            print(f"[Kubernetes MCP] API container is down after {down_after:.1f} seconds")
+        
+        # Now wait for it to come back up
+        update_operation(operation, "running", "Waiting for container to become ready")
+        ready_after = await wait_for_health(True, RESTART_READY_TIMEOUT)
+        if ready_after is None:
+            update_operation(operation, "failed", f"Pod {operation.pod_name} did not become ready within {RESTART_READY_TIMEOUT} seconds")
+        else:
+            update_operation(operation, "succeeded", f"Pod {operation.pod_name} in namespace {operation.namespace} restarted successfully")
     except Exception as e:
-        return PodRestartOutput(
-            success=False,
-            message=f"Failed to restart pod: {str(e)}"
+        update_operation(operation, "failed", f"Failed to restart pod: {str(e)}")
+    finally:
+        active_restarts.pop(f"{operation.namespace}/{operation.pod_name}", None)
+        operation_tasks.pop(operation.operation_id, None)
+
+async def wait_for_operation(operation_id: str, timeout: float):
+    """Wait up to timeout seconds for an operation to complete"""
+    task = operation_tasks.get(operation_id)
+    if task is None:
+        return
+    try:
+        # Shield the restart so a timed out waiter does not cancel it
+        await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+    except asyncio.TimeoutError:
+        pass
+
+# MCP Protocol Routes
+@app.post("/mcp/tools/restart_pod", response_model=PodRestartOutput)
+async def restart_pod(input_data: PodRestartInput):
+    """Start restarting a pod and return its operation id
+    
+    Restarts run in the background; pass wait=true to block until the pod is
+    ready again (or timeout expires), or poll get_operation with the id.
+    """
+    pod_key = f"{input_data.namespace}/{input_data.pod_name}"
+    
+    # A restart of the same pod that is still in progress is reused
+    operation_id = active_restarts.get(pod_key)
+    if operation_id is None:
+        now = time.time()
+        operation = OperationOutput(
+            operation_id=str(uuid.uuid4()),
+            type="restart_pod",
+            pod_name=input_data.pod_name,
+            namespace=input_data.namespace,
+            status="pending",
+            message="Restart requested",
+            created_at=now,
+            updated_at=now
         )
+        operation_id = operation.operation_id
+        operations[operation_id] = operation
+        active_restarts[pod_key] = operation_id
+        prune_operations()
+        
+        print(f"[Kubernetes MCP] Restarting pod {input_data.pod_name} in namespace {input_data.namespace} (operation {operation_id})")
+        operation_tasks[operation_id] = asyncio.create_task(run_restart(operation))
+    else:
+        print(f"[Kubernetes MCP] Restart of pod {input_data.pod_name} already in progress (operation {operation_id})")
+    
+    if input_data.wait:
+        await wait_for_operation(operation_id, input_data.timeout)
+    
+    operation = operations[operation_id]
+    return PodRestartOutput(
+        success=operation.status != "failed",
+        message=operation.message,
+        operation_id=operation_id,
+        status=operation.status
+    )
+
+@app.post("/mcp/tools/get_operation", response_model=OperationOutput)
+async def get_operation(input_data: GetOperationInput):
+    """Get the status of a restart operation"""
+    if input_data.operation_id not in operations:
+        raise HTTPException(status_code=404, detail=f"Operation {input_data.operation_id} not found")
+    
+    if input_data.wait:
+        await wait_for_operation(input_data.operation_id, input_data.timeout)
+    
+    return operations[input_data.operation_id]
 
 @app.post("/mcp/tools/list_pods", response_model=PodListOutput)
 async def list_pods(input_data: PodListInput):
@@ -618,16 +735,31 @@ async def get_schema():
         "tools": [
             {
                 "name": "restart_pod",
-                "description": "Restart a pod by deleting it (Kubernetes will recreate it)",
+                "description": "Restart a pod by deleting it (Kubernetes will recreate it). Returns an operation id; set wait to block until the pod is ready",
                 "input_schema": {
                     "type": "object",
                     "properties": {
                         "namespace": {"type": "string", "default": "default"},
-                        "pod_name": {"type": "string"}
+                        "pod_name": {"type": "string"},
+                        "wait": {"type": "boolean", "default": False},
+                        "timeout": {"type": "number", "default": 30}
                     },
                     "required": ["pod_name"]
                 }
             },
+            {
+                "name": "get_operation",
+                "description": "Get the status of a restart operation, optionally waiting for it to complete",
+                "input_schema": {
+                    "type": "object",
+                    "properties": {
+                        "operation_id": {"type": "string"},
+                        "wait": {"type": "boolean", "default": False},
+                        "timeout": {"type": "number", "default": 30}
+                    },
+                    "required": ["operation_id"]
+                }
+            },
             {
                 "name": "list_pods",
                 "description": "List pods in a namespace",
@@ -679,6 +811,14 @@ async def get_schema():
         "resources": []
     }
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the shared HTTP client"""
+    global http_client
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+
 # Health check endpoint
 @app.get("/health")
 async def health():
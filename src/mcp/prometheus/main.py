@@ -1,10 +1,18 @@
 import os
+import sys
 import json
 import time
+import math
+import base64
+from array import array
+import asyncio
+from collections import deque, OrderedDict
+from datetime import datetime
 from typing import Dict, List, Optional, Any, Union
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, Field
-import requests
+import httpx
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -16,6 +24,34 @@ app = FastAPI(title="Prometheus MCP Server", description="MCP server for Prometh
 # Get Prometheus URL from environment variable
 prometheus_url = os.environ.get("PROMETHEUS_URL", "http://prometheus:9090")
 
+# Maximum number of queries accepted by a single query_batch call
+MAX_BATCH_QUERIES = int(os.environ.get("PROMETHEUS_MAX_BATCH_QUERIES", "50"))
+
+# HTTP client settings
+PROMETHEUS_TIMEOUT = float(os.environ.get("PROMETHEUS_TIMEOUT", "10"))
+MAX_CONCURRENCY = int(os.environ.get("PROMETHEUS_MAX_CONCURRENCY", "16"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("PROMETHEUS_MAX_KEEPALIVE_CONNECTIONS", "16"))
+
+# Number of recent upstream request latencies kept for percentiles
+LATENCY_SAMPLES = int(os.environ.get("PROMETHEUS_LATENCY_SAMPLES", "1000"))
+
+# Instant query cache. The TTL defaults to the shortest scrape interval in
+# prometheus.yml (5s for the test-app job), so a cached result is never older
+# than the data it was computed from. Set PROMETHEUS_CACHE_TTL=0 to disable.
+CACHE_TTL = float(os.environ.get("PROMETHEUS_CACHE_TTL", "5"))
+CACHE_MAX_ENTRIES = int(os.environ.get("PROMETHEUS_CACHE_MAX_ENTRIES", "1024"))
+
+# Range query chunk cache. Ranges are split into chunks of RANGE_CHUNK_STEPS
+# steps on an absolute step grid, and a chunk is only cached once its last
+# point is older than RANGE_SETTLE_SECONDS (late samples can still change it).
+RANGE_CHUNK_STEPS = int(os.environ.get("PROMETHEUS_RANGE_CHUNK_STEPS", "60"))
+RANGE_SETTLE_SECONDS = float(os.environ.get("PROMETHEUS_RANGE_SETTLE_SECONDS", "60"))
+RANGE_CACHE_MAX_CHUNKS = int(os.environ.get("PROMETHEUS_RANGE_CACHE_MAX_CHUNKS", "4096"))
+
+# Shared HTTP client and concurrency limit, created on startup
+http_client: Optional[httpx.AsyncClient] = None
+request_semaphore: Optional[asyncio.Semaphore] = None
+
 # MCP Models
 class MCPToolInput(BaseModel):
     """Base model for MCP tool inputs"""
@@ -39,6 +75,13 @@ class QueryInput(MCPToolInput):
     query: str = Field(..., description="Prometheus PromQL query")
     time: Optional[str] = Field(None, description="Evaluation timestamp (RFC3339 or Unix timestamp)")
     timeout: Optional[str] = Field(None, description="Evaluation timeout")
+    format: Optional[str] = Field(None, description="Result format: json (default) or compact")
+
+class QueryBatchInput(MCPToolInput):
+    queries: List[str] = Field(..., description="Prometheus PromQL queries")
+    time: Optional[str] = Field(None, description="Shared evaluation timestamp (RFC3339 or Unix timestamp), defaults to now")
+    timeout: Optional[str] = Field(None, description="Evaluation timeout for each query")
+    format: Optional[str] = Field(None, description="Result format: json (default) or compact")
 
 class QueryRangeInput(MCPToolInput):
     query: str = Field(..., description="Prometheus PromQL query")
@@ -46,6 +89,7 @@ class QueryRangeInput(MCPToolInput):
     end: str = Field(..., description="End timestamp (RFC3339 or Unix timestamp)")
     step: str = Field(..., description="Query resolution step width")
     timeout: Optional[str] = Field(None, description="Evaluation timeout")
+    format: Optional[str] = Field(None, description="Result format: json (default) or compact")
 
 class AlertsInput(MCPToolInput):
     active: Optional[bool] = Field(None, description="Filter by active alerts")
@@ -68,6 +112,18 @@ class MetricSeries(BaseModel):
 class QueryOutput(MCPToolOutput):
     result_type: str
     result: List[Dict[str, Any]]
+    format: str = "json"
+
+class QueryBatchResult(BaseModel):
+    query: str
+    result_type: Optional[str] = None
+    result: List[Dict[str, Any]] = []
+    format: str = "json"
+    error: Optional[str] = None
+
+class QueryBatchOutput(MCPToolOutput):
+    time: str
+    results: List[QueryBatchResult]
 
 class AlertOutput(BaseModel):
     labels: Dict[str, str]
@@ -92,62 +148,439 @@ class TargetsOutput(MCPToolOutput):
 class MetricsListOutput(MCPToolOutput):
     metrics: List[str]
 
+class LatencyTracker:
+    """Keeps recent request latencies and reports percentiles"""
+    
+    def __init__(self, max_samples: int):
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.errors = 0
+    
+    def record(self, seconds: float, error: bool = False):
+        self.samples.append(seconds)
+        self.count += 1
+        if error:
+            self.errors += 1
+    
+    def percentile(self, ordered: List[float], pct: float) -> float:
+        if not ordered:
+            return 0.0
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "samples": len(ordered),
+            "p50_ms": self.percentile(ordered, 50) * 1000,
+            "p90_ms": self.percentile(ordered, 90) * 1000,
+            "p99_ms": self.percentile(ordered, 99) * 1000,
+            "max_ms": (ordered[-1] if ordered else 0.0) * 1000
+        }
+
+upstream_latency = LatencyTracker(LATENCY_SAMPLES)
+
+class QueryCache:
+    """TTL and LRU bounded result cache with single-flight request coalescing"""
+    
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.in_flight: Dict[Any, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.expired = 0
+        self.evictions = 0
+    
+    async def get_or_fetch(self, key: Any, fetch):
+        """Return the cached value for key, or run fetch() once for all concurrent callers"""
+        entry = self.entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self.entries[key]
+            self.expired += 1
+        
+        task = self.in_flight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._fetch(key, fetch))
+            # Mark a failure as retrieved even if every caller has gone away
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self.in_flight[key] = task
+        else:
+            self.coalesced += 1
+        
+        # Shield the shared fetch so one cancelled caller does not cancel it for the others
+        return await asyncio.shield(task)
+    
+    async def _fetch(self, key: Any, fetch):
+        try:
+            value = await fetch()
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            return value
+        finally:
+            self.in_flight.pop(key, None)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "ttl_seconds": self.ttl,
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "in_flight": len(self.in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0
+        }
+
+query_cache = QueryCache(CACHE_TTL, CACHE_MAX_ENTRIES)
+
+class RangeChunkCache:
+    """LRU bounded store of completed range query chunks"""
+    
+    def __init__(self, max_chunks: int):
+        self.max_chunks = max_chunks
+        self.chunks = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.upstream_requests = 0
+    
+    def get(self, key: Any) -> Optional[List[Dict[str, Any]]]:
+        series = self.chunks.get(key)
+        if series is None:
+            self.misses += 1
+            return None
+        self.chunks.move_to_end(key)
+        self.hits += 1
+        return series
+    
+    def put(self, key: Any, series: List[Dict[str, Any]]):
+        self.chunks[key] = series
+        self.chunks.move_to_end(key)
+        while len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+            self.evictions += 1
+    
+    def to_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "chunk_steps": RANGE_CHUNK_STEPS,
+            "settle_seconds": RANGE_SETTLE_SECONDS,
+            "chunks": len(self.chunks),
+            "max_chunks": self.max_chunks,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "upstream_requests": self.upstream_requests,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
+
+range_cache = RangeChunkCache(RANGE_CACHE_MAX_CHUNKS)
+
 # Helper functions
-def make_prometheus_request(endpoint: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+def create_http_client() -> httpx.AsyncClient:
+    """Create the shared keep-alive HTTP client for Prometheus"""
+    return httpx.AsyncClient(
+        base_url=f"{prometheus_url}/api/v1/",
+        timeout=PROMETHEUS_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=MAX_CONCURRENCY,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS
+        )
+    )
+
+async def make_prometheus_request(endpoint: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
     """Make a request to the Prometheus API"""
-    url = f"{prometheus_url}/api/v1/{endpoint}"
+    global http_client, request_semaphore
+    if http_client is None:
+        http_client = create_http_client()
+    if request_semaphore is None:
+        request_semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    
+    async with request_semaphore:
+        started = time.perf_counter()
+        try:
+            response = await http_client.get(endpoint, params=params)
+            response.raise_for_status()
+            upstream_latency.record(time.perf_counter() - started)
+            return response.json()
+        except httpx.HTTPError as e:
+            upstream_latency.record(time.perf_counter() - started, error=True)
+            raise HTTPException(status_code=500, detail=f"Error communicating with Prometheus: {str(e)}")
+
+RESULT_FORMATS = ("json", "compact")
+
+def pack_float64(values: List[float]) -> str:
+    """Pack floats as a base64 little-endian float64 buffer"""
+    packed = array("d", values)
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return base64.b64encode(packed.tobytes()).decode("ascii")
+
+def encode_result(output: QueryOutput, result_format: Optional[str]) -> QueryOutput:
+    """Convert a query result to the requested format
+    
+    The compact format replaces each series' [[ts, "value"], ...] points with
+    "timestamps" and "values" columns packed by pack_float64, so a client can
+    decode them without parsing every sample.
+    """
+    if result_format in (None, "json"):
+        return output
+    if result_format not in RESULT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown result format: {result_format}")
+    if output.result_type not in ("vector", "matrix"):
+        return output
+    
+    result = []
+    for series in output.result:
+        points = series["values"] if output.result_type == "matrix" else [series["value"]]
+        result.append({
+            "metric": series.get("metric", {}),
+            "count": len(points),
+            "timestamps": pack_float64([float(point[0]) for point in points]),
+            "values": pack_float64([float(point[1]) for point in points])
+        })
+    return QueryOutput(result_type=output.result_type, result=result, format=result_format)
+
+def parse_timestamp(value: str) -> Optional[float]:
+    """Parse a Unix or RFC3339 timestamp, returning None if it is neither"""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+DURATION_UNITS_MS = {"ms": 1, "s": 1000, "m": 60000, "h": 3600000, "d": 86400000, "w": 604800000, "y": 31536000000}
+
+def parse_duration_ms(value: str) -> Optional[int]:
+    """Parse a step as float seconds or a Prometheus duration (e.g. 15s, 1m30s) into milliseconds"""
     try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Error communicating with Prometheus: {str(e)}")
+        return int(round(float(value) * 1000))
+    except ValueError:
+        pass
+    
+    total = 0
+    number = ""
+    index = 0
+    while index < len(value):
+        char = value[index]
+        if char.isdigit():
+            number += char
+            index += 1
+            continue
+        unit = "ms" if value.startswith("ms", index) else char
+        if not number or unit not in DURATION_UNITS_MS:
+            return None
+        total += int(number) * DURATION_UNITS_MS[unit]
+        number = ""
+        index += len(unit)
+    return total if not number and total > 0 else None
+
+def align_time(eval_time: Optional[str]) -> Optional[str]:
+    """Round an evaluation time (default now) down to the cache TTL grid"""
+    timestamp = time.time() if eval_time is None else parse_timestamp(eval_time)
+    if timestamp is None:
+        return eval_time
+    return f"{math.floor(timestamp / CACHE_TTL) * CACHE_TTL:.3f}"
+
+async def instant_query(query: str, eval_time: Optional[str] = None, timeout: Optional[str] = None) -> QueryOutput:
+    """Execute an instant query through the result cache"""
+    if CACHE_TTL <= 0:
+        return await fetch_instant_query(query, eval_time, timeout)
+    
+    # Queries evaluated within the same scrape interval share one result
+    eval_time = align_time(eval_time)
+    return await query_cache.get_or_fetch(
+        (query, eval_time, timeout),
+        lambda: fetch_instant_query(query, eval_time, timeout)
+    )
+
+async def fetch_instant_query(query: str, eval_time: Optional[str] = None, timeout: Optional[str] = None) -> QueryOutput:
+    """Execute an instant query and convert the response"""
+    params = {"query": query}
+    if eval_time:
+        params["time"] = eval_time
+    if timeout:
+        params["timeout"] = timeout
+    
+    response = await make_prometheus_request("query", params)
+    if response["status"] != "success":
+        raise HTTPException(status_code=400, detail=response.get("error", "Unknown error"))
+    
+    return QueryOutput(
+        result_type=response["data"]["resultType"],
+        result=response["data"]["result"]
+    )
 
 # MCP Protocol Routes
 @app.post("/mcp/tools/query", response_model=QueryOutput)
 async def query(input_data: QueryInput):
     """Execute an instant query against Prometheus"""
-    params = {"query": input_data.query}
-    if input_data.time:
-        params["time"] = input_data.time
-    if input_data.timeout:
-        params["timeout"] = input_data.timeout
-    
     try:
-        response = make_prometheus_request("query", params)
-        if response["status"] != "success":
-            raise HTTPException(status_code=400, detail=response.get("error", "Unknown error"))
-        
-        return QueryOutput(
-            result_type=response["data"]["resultType"],
-            result=response["data"]["result"]
-        )
+        output = await instant_query(input_data.query, input_data.time, input_data.timeout)
+        return encode_result(output, input_data.format)
     except Exception as e:
         if isinstance(e, HTTPException):
             raise e
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/mcp/tools/query_range", response_model=QueryOutput)
-async def query_range(input_data: QueryRangeInput):
-    """Execute a range query against Prometheus"""
+@app.post("/mcp/tools/query_batch", response_model=QueryBatchOutput)
+async def query_batch(input_data: QueryBatchInput):
+    """Execute several instant queries concurrently at one shared evaluation time"""
+    if not input_data.queries:
+        raise HTTPException(status_code=400, detail="No queries given")
+    if len(input_data.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_QUERIES} queries can be batched")
+    if input_data.format not in (None, *RESULT_FORMATS):
+        raise HTTPException(status_code=400, detail=f"Unknown result format: {input_data.format}")
+    
+    # Pin the evaluation time so every query sees the same instant
+    eval_time = input_data.time or str(time.time())
+    if CACHE_TTL > 0:
+        eval_time = align_time(eval_time)
+    
+    async def run(query: str) -> QueryBatchResult:
+        try:
+            output = encode_result(await instant_query(query, eval_time, input_data.timeout), input_data.format)
+            return QueryBatchResult(query=query, result_type=output.result_type, result=output.result, format=output.format)
+        except HTTPException as e:
+            return QueryBatchResult(query=query, error=str(e.detail))
+        except Exception as e:
+            return QueryBatchResult(query=query, error=str(e))
+    
+    # A failing query is reported in its own result instead of failing the whole batch
+    results = await asyncio.gather(*(run(query) for query in input_data.queries))
+    return QueryBatchOutput(time=eval_time, results=list(results))
+
+async def fetch_range_query(query: str, start: str, end: str, step: str, timeout: Optional[str] = None) -> QueryOutput:
+    """Execute a range query and convert the response"""
     params = {
-        "query": input_data.query,
-        "start": input_data.start,
-        "end": input_data.end,
-        "step": input_data.step
+        "query": query,
+        "start": start,
+        "end": end,
+        "step": step
     }
-    if input_data.timeout:
-        params["timeout"] = input_data.timeout
+    if timeout:
+        params["timeout"] = timeout
     
-    try:
-        response = make_prometheus_request("query_range", params)
-        if response["status"] != "success":
-            raise HTTPException(status_code=400, detail=response.get("error", "Unknown error"))
+    response = await make_prometheus_request("query_range", params)
+    if response["status"] != "success":
+        raise HTTPException(status_code=400, detail=response.get("error", "Unknown error"))
+    
+    return QueryOutput(
+        result_type=response["data"]["resultType"],
+        result=response["data"]["result"]
+    )
+
+def format_ms(value: int) -> str:
+    """Format a millisecond timestamp as Unix seconds"""
+    return f"{value / 1000:.3f}"
+
+async def range_query(query: str, start: str, end: str, step: str, timeout: Optional[str] = None) -> QueryOutput:
+    """Execute a range query, fetching only the step-aligned chunks that are not cached
+    
+    Points are evaluated on an absolute grid of multiples of the step, so the
+    same chunk is reusable by every window that overlaps it. Consecutive
+    missing chunks are fetched with one upstream request per run, which for a
+    sliding window means just the new head or tail.
+    """
+    start_ts, end_ts, step_ms = parse_timestamp(start), parse_timestamp(end), parse_duration_ms(step)
+    if RANGE_CHUNK_STEPS <= 0 or start_ts is None or end_ts is None or step_ms is None or end_ts < start_ts:
+        range_cache.upstream_requests += 1
+        return await fetch_range_query(query, start, end, step, timeout)
+    
+    chunk_ms = step_ms * RANGE_CHUNK_STEPS
+    first_ms = -(-int(round(start_ts * 1000)) // step_ms) * step_ms
+    last_ms = int(round(end_ts * 1000)) // step_ms * step_ms
+    complete_before_ms = int((time.time() - RANGE_SETTLE_SECONDS) * 1000)
+    
+    chunk_indexes = range(first_ms // chunk_ms, last_ms // chunk_ms + 1)
+    chunk_series: Dict[int, List[Dict[str, Any]]] = {}
+    missing = []
+    for index in chunk_indexes:
+        cached = range_cache.get((query, step_ms, timeout, index))
+        if cached is None:
+            missing.append(index)
+        else:
+            chunk_series[index] = cached
+    
+    # Group missing chunks into runs of consecutive indexes
+    runs = []
+    for index in missing:
+        if runs and runs[-1][-1] == index - 1:
+            runs[-1].append(index)
+        else:
+            runs.append([index])
+    
+    async def fetch_run(run: List[int]):
+        run_start_ms = run[0] * chunk_ms
+        run_end_ms = (run[-1] + 1) * chunk_ms - step_ms
+        # Fetch whole chunks so they can be cached, except one that is still filling up
+        if run_end_ms > complete_before_ms:
+            run_end_ms = min(run_end_ms, max(last_ms, run_start_ms))
+        range_cache.upstream_requests += 1
+        output = await fetch_range_query(query, format_ms(run_start_ms), format_ms(run_end_ms), format_ms(step_ms), timeout)
         
-        return QueryOutput(
-            result_type=response["data"]["resultType"],
-            result=response["data"]["result"]
-        )
+        # Split every series of the run back into its chunks
+        split = {index: [] for index in run}
+        for series in output.result:
+            by_chunk: Dict[int, List[Any]] = {}
+            for point in series.get("values", []):
+                point_ms = int(round(float(point[0]) * 1000))
+                by_chunk.setdefault(point_ms // chunk_ms, []).append(point)
+            for index, values in by_chunk.items():
+                if index in split:
+                    split[index].append({"metric": series.get("metric", {}), "values": values})
+        
+        for index, series_list in split.items():
+            chunk_series[index] = series_list
+            if (index + 1) * chunk_ms - step_ms <= complete_before_ms:
+                range_cache.put((query, step_ms, timeout, index), series_list)
+    
+    await asyncio.gather(*(fetch_run(run) for run in runs))
+    
+    # Stitch the chunks back together per series, trimmed to the requested range
+    stitched: Dict[Any, Dict[str, Any]] = {}
+    for index in chunk_indexes:
+        for series in chunk_series.get(index, []):
+            labels = tuple(sorted(series["metric"].items()))
+            if labels not in stitched:
+                stitched[labels] = {"metric": series["metric"], "values": []}
+            stitched[labels]["values"].extend(
+                point for point in series["values"]
+                if first_ms <= int(round(float(point[0]) * 1000)) <= last_ms
+            )
+    
+    return QueryOutput(
+        result_type="matrix",
+        result=[series for series in stitched.values() if series["values"]]
+    )
+
+@app.post("/mcp/tools/query_range", response_model=QueryOutput)
+async def query_range(input_data: QueryRangeInput):
+    """Execute a range query against Prometheus"""
+    try:
+        output = await range_query(input_data.query, input_data.start, input_data.end, input_data.step, input_data.timeout)
+        return encode_result(output, input_data.format)
     except Exception as e:
         if isinstance(e, HTTPException):
             raise e
@@ -169,7 +602,7 @@ async def alerts(input_data: AlertsInput):
         params["filter"] = input_data.filter
     
     try:
-        response = make_prometheus_request("alerts", params)
+        response = await make_prometheus_request("alerts", params)
         if response["status"] != "success":
             raise HTTPException(status_code=400, detail=response.get("error", "Unknown error"))
         
@@ -197,7 +630,7 @@ async def targets(input_data: TargetsInput):
         params["state"] = input_data.state
     
     try:
-        response = make_prometheus_request("targets", params)
+        response = await make_prometheus_request("targets", params)
         if response["status"] != "success":
             raise HTTPException(status_code=400, detail=response.get("error", "Unknown error"))
         
@@ -221,7 +654,7 @@ async def targets(input_data: TargetsInput):
 async def metrics():
     """Get list of metrics from Prometheus"""
     try:
-        response = make_prometheus_request("label/__name__/values")
+        response = await make_prometheus_request("label/__name__/values")
         if response["status"] != "success":
             raise HTTPException(status_code=400, detail=response.get("error", "Unknown error"))
         
@@ -248,11 +681,26 @@ async def get_schema():
                     "properties": {
                         "query": {"type": "string"},
                         "time": {"type": "string"},
-                        "timeout": {"type": "string"}
+                        "timeout": {"type": "string"},
+                        "format": {"type": "string", "enum": ["json", "compact"]}
                     },
                     "required": ["query"]
                 }
             },
+            {
+                "name": "query_batch",
+                "description": "Execute several instant queries concurrently at one shared evaluation time",
+                "input_schema": {
+                    "type": "object",
+                    "properties": {
+                        "queries": {"type": "array", "items": {"type": "string"}},
+                        "time": {"type": "string"},
+                        "timeout": {"type": "string"},
+                        "format": {"type": "string", "enum": ["json", "compact"]}
+                    },
+                    "required": ["queries"]
+                }
+            },
             {
                 "name": "query_range",
                 "description": "Execute a range query against Prometheus",
@@ -263,7 +711,8 @@ async def get_schema():
                         "start": {"type": "string"},
                         "end": {"type": "string"},
                         "step": {"type": "string"},
-                        "timeout": {"type": "string"}
+                        "timeout": {"type": "string"},
+                        "format": {"type": "string", "enum": ["json", "compact"]}
                     },
                     "required": ["query", "start", "end", "step"]
                 }
@@ -304,6 +753,66 @@ async def get_schema():
         "resources": []
     }
 
+# Statistics endpoint
+@app.get("/stats")
+async def stats():
+    """Get upstream Prometheus request statistics"""
+    return {
+        "max_concurrency": MAX_CONCURRENCY,
+        "upstream_latency": upstream_latency.to_dict(),
+        "query_cache": query_cache.to_dict(),
+        "range_cache": range_cache.to_dict()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Expose server statistics in the Prometheus text format"""
+    cache_stats = query_cache.to_dict()
+    latency_stats = upstream_latency.to_dict()
+    range_stats = range_cache.to_dict()
+    lines = [
+        "# TYPE prometheus_mcp_query_cache_requests_total counter"
+    ]
+    for result in ("hits", "misses", "coalesced"):
+        lines.append(f'prometheus_mcp_query_cache_requests_total{{result="{result}"}} {cache_stats[result]}')
+    lines += [
+        "# TYPE prometheus_mcp_query_cache_evictions_total counter",
+        f"prometheus_mcp_query_cache_evictions_total {cache_stats['evictions']}",
+        "# TYPE prometheus_mcp_query_cache_expired_total counter",
+        f"prometheus_mcp_query_cache_expired_total {cache_stats['expired']}",
+        "# TYPE prometheus_mcp_query_cache_entries gauge",
+        f"prometheus_mcp_query_cache_entries {cache_stats['entries']}",
+        "# TYPE prometheus_mcp_range_cache_chunks_total counter",
+        f'prometheus_mcp_range_cache_chunks_total{{result="hits"}} {range_stats["hits"]}',
+        f'prometheus_mcp_range_cache_chunks_total{{result="misses"}} {range_stats["misses"]}',
+        "# TYPE prometheus_mcp_range_cache_upstream_requests_total counter",
+        f"prometheus_mcp_range_cache_upstream_requests_total {range_stats['upstream_requests']}",
+        "# TYPE prometheus_mcp_upstream_requests_total counter",
+        f"prometheus_mcp_upstream_requests_total {latency_stats['count']}",
+        "# TYPE prometheus_mcp_upstream_errors_total counter",
+        f"prometheus_mcp_upstream_errors_total {latency_stats['errors']}",
+        "# TYPE prometheus_mcp_upstream_latency_seconds summary"
+    ]
+    for quantile, key in (("0.5", "p50_ms"), ("0.9", "p90_ms"), ("0.99", "p99_ms")):
+        lines.append(f'prometheus_mcp_upstream_latency_seconds{{quantile="{quantile}"}} {latency_stats[key] / 1000}')
+    return "\n".join(lines) + "\n"
+
+# Lifecycle events
+@app.on_event("startup")
+async def startup_event():
+    """Create the shared HTTP client"""
+    global http_client, request_semaphore
+    http_client = create_http_client()
+    request_semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the shared HTTP client"""
+    global http_client
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+
 # Health check endpoint
 @app.get("/health")
 async def health():
@@ -313,11 +313,22 @@ function loadAgentStatus() {
     }, 5000);
 }
 
-// Load agent logs
+// Sequence id of the newest log we have received
+let lastAgentLogSeq = 0;
+
+// Load agent logs (only the ones newer than what we already have)
 function loadAgentLogs() {
-    fetch('/api/agent/logs')
+    fetch(`/api/agent/logs?after=${lastAgentLogSeq}`)
         .then(response => response.json())
         .then(data => {
+            if (typeof data.last_seq === 'number') {
+                // The server restarted and its sequence started over
+                if (data.last_seq < lastAgentLogSeq) {
+                    lastAgentLogSeq = 0;
+                    return loadAgentLogs();
+                }
+                lastAgentLogSeq = data.last_seq;
+            }
             displayAgentLogs(data.logs);
         })
         .catch(error => {
@@ -333,8 +344,10 @@ function displayAgentLogs(logs) {
     const agentLogsElement = document.getElementById('agentLogs');
     
     if (!logs || logs.length === 0) {
-        agentLogsElement.innerHTML = '<p>No logs available</p>';
-        displayedLogIds.clear();
+        // An empty incremental response just means there is nothing new
+        if (displayedLogIds.size === 0) {
+            agentLogsElement.innerHTML = '<p>No logs available</p>';
+        }
         return;
     }
     
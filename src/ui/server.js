@@ -175,6 +175,8 @@ app.get('/api/grafana/health', async (req, res) => {
 // In-memory cache for agent logs
 let agentLogs = [];
 const MAX_LOGS = 100; // Maximum number of logs to keep in memory
+let lastAgentLogSeq = 0; // Sequence id of the newest log fetched from the agent
+let nextLocalLogSeq = 1; // Sequence ids handed out to logs cached by this server
 
 // Function to parse agent logs from Docker logs format
 function parseAgentLog(logLine) {
@@ -215,6 +217,7 @@ function addAgentLog(logLine) {
   const parsedLog = parseAgentLog(logLine);
   // Accept logs from all agent components (agent, agent.seer, agent.medic, etc.)
   if (parsedLog && parsedLog.component.startsWith('agent') && parsedLog.level === 'INFO') {
+    parsedLog.seq = nextLocalLogSeq++;
     agentLogs.unshift(parsedLog); // Add to the beginning of the array (newest first)
     
     // Trim the logs array if it exceeds the maximum size
@@ -230,29 +233,35 @@ function addAgentLog(logLine) {
 // No initialization of logs - they will be fetched from the agent container
 
 // Agent logs endpoint
+// Pass ?after=<last_seq> to only receive logs that were not returned before
 app.get('/api/agent/logs', async (req, res) => {
   try {
-    // Keep track of the latest timestamp we've seen
-    const latestTimestamp = agentLogs.length > 0 
-      ? Math.max(...agentLogs.map(log => new Date(log.timestamp).getTime()))
-      : 0;
+    const after = parseInt(req.query.after, 10) || 0;
     
     // Try to fetch logs from the agent server
     try {
-      // Make a request to the agent server to get logs
-      const response = await axios.get(`${AGENT_URL}/api/logs`, { timeout: 2000 });
+      // Only ask the agent for logs newer than the last one we have
+      let response = await axios.get(`${AGENT_URL}/api/logs`, {
+        params: { after: lastAgentLogSeq },
+        timeout: 2000
+      });
+      
+      // If the agent restarted its sequence starts over, so fetch everything again
+      if (response.data && typeof response.data.last_seq === 'number' && response.data.last_seq < lastAgentLogSeq) {
+        lastAgentLogSeq = 0;
+        response = await axios.get(`${AGENT_URL}/api/logs`, { timeout: 2000 });
+      }
       
       // If we got logs from the agent server, convert them to our format
       if (response.data && response.data.logs && Array.isArray(response.data.logs)) {
         let newLogsCount = 0;
         
-        // Process each log from the agent server
-        response.data.logs.forEach(log => {
+        // The agent returns newest first; cache them oldest first so the newest ends up on top
+        response.data.logs.slice().reverse().forEach(log => {
           // Include INFO logs from all agent components (agent, agent.seer, agent.medic, etc.)
           if (log.level === 'INFO' && log.component.startsWith('agent')) {
             // Convert timestamp to ISO format
             const timestamp = new Date(log.timestamp * 1000).toISOString();
-            const logTime = new Date(timestamp).getTime();
             
             // Extract agent type from component (e.g., "agent.seer" -> "seer")
             let agentType = "system";
@@ -260,22 +269,24 @@ app.get('/api/agent/logs', async (req, res) => {
               agentType = log.component.split('.')[1];
             }
             
-            // Only add logs that are newer than what we already have
-            if (logTime > latestTimestamp) {
-              // Add the log to our in-memory cache
-              agentLogs.unshift({
-                timestamp: timestamp,
-                component: log.component,
-                level: log.level,
-                message: log.message,
-                agentType: agentType
-              });
-              
-              newLogsCount++;
-            }
+            // Add the log to our in-memory cache
+            agentLogs.unshift({
+              seq: nextLocalLogSeq++,
+              timestamp: timestamp,
+              component: log.component,
+              level: log.level,
+              message: log.message,
+              agentType: agentType
+            });
+            
+            newLogsCount++;
           }
         });
         
+        if (typeof response.data.last_seq === 'number') {
+          lastAgentLogSeq = response.data.last_seq;
+        }
+        
         // Trim the logs array if it exceeds the maximum size
         if (agentLogs.length > MAX_LOGS) {
           agentLogs = agentLogs.slice(0, MAX_LOGS);
@@ -303,9 +314,10 @@ app.get('/api/agent/logs', async (req, res) => {
       }
     }
     
-    // Return the logs we have in memory
+    // Return the cached logs the caller has not seen yet
     return res.status(200).send({ 
-      logs: agentLogs
+      logs: agentLogs.filter(log => log.seq > after),
+      last_seq: nextLocalLogSeq - 1
     });
   } catch (error) {
     console.error('Agent logs fetch failed:', error.message);